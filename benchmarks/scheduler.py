@@ -0,0 +1,79 @@
+from __future__ import print_function
+
+import sys
+
+sys.path.append('..')
+
+from src.scheduler import Scheduler
+
+import optparse
+import random
+import time
+
+
+class Hold(object):
+    """ Classic hold-model workload: every event schedules one new
+        event, so the number of pending events stays constant. """
+
+    def __init__(self, scheduler, events, increment):
+        self.scheduler = scheduler
+        self.remaining = events
+        self.increment = increment
+
+    def handle(self, event):
+        self.remaining -= 1
+        if self.remaining > 0:
+            self.scheduler.add(delay=self.increment(), event=None, handler=self.handle)
+
+
+def exponential():
+    return random.expovariate(1.0)
+
+
+def uniform():
+    return random.uniform(0, 2.0)
+
+
+def clustered():
+    # most events fall on a handful of identical timestamps, as with
+    # many zero-delay sends or synchronized packet generators
+    return random.choice((0, 0, 0, 1.0))
+
+
+def bimodal():
+    # short link delays mixed with long application timers
+    return random.choice((0.001, 0.001, 0.001, 100.0))
+
+
+def bench(backend, pending, events, increment):
+    random.seed(1)
+    scheduler = Scheduler(backend)
+    hold = Hold(scheduler, events, increment)
+    start = time.time()
+    for _ in range(pending):
+        scheduler.add(delay=increment(), event=None, handler=hold.handle)
+    scheduler.run()
+    return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("-e", "--events", type="int", dest="events",
+                      default=200000,
+                      help="events to dispatch per run")
+    (options, args) = parser.parse_args()
+
+    workloads = [('exponential', exponential), ('uniform', uniform),
+                 ('clustered', clustered), ('bimodal', bimodal)]
+    print("%-12s %9s %12s %12s %8s" % ('workload', 'pending', 'heap us/ev', 'cal us/ev', 'speedup'))
+    for name, increment in workloads:
+        for pending in (1000, 100000, 1000000):
+            events = options.events + pending
+            heap = bench('heap', pending, events, increment)
+            calendar = bench('calendar', pending, events, increment)
+            print("%-12s %9d %12.3f %12.3f %8.2f" % (
+                name, pending, 1e6 * heap / events, 1e6 * calendar / events, heap / calendar))
+
+
+if __name__ == '__main__':
+    main()
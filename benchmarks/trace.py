@@ -0,0 +1,82 @@
+from __future__ import print_function
+
+import sys
+
+sys.path.append('..')
+
+from src.sim import Simulation
+from src.packet import Packet
+
+from networks.network import Network
+
+import optparse
+import os
+import subprocess
+import time
+
+
+class Sink(object):
+    @staticmethod
+    def receive_packet(packet):
+        pass
+
+
+def forward(packets, debug):
+    """ Send packets from n2 to n5 over the three hops of the five-node
+        network and return the wall time of the run. """
+    sim = Simulation(seed=1)
+    if debug:
+        sim.set_debug('Node')
+        sim.set_debug('Link')
+    net = Network('../networks/five-nodes.txt', sim=sim)
+    n1, n2, n3, n5 = [net.get_node(name) for name in ('n1', 'n2', 'n3', 'n5')]
+    destination = n5.get_address('n3')
+    n2.add_forwarding_entry(address=destination, link=n2.get_link('n1'))
+    n1.add_forwarding_entry(address=destination, link=n1.get_link('n3'))
+    n3.add_forwarding_entry(address=destination, link=n3.get_link('n5'))
+    n5.add_protocol(protocol='sink', handler=Sink())
+
+    # space the packets so the links never queue
+    sim.scheduler.add_many((0.01 * i, Packet(destination_address=destination, ident=i, protocol='sink', length=100),
+                            n2.send_packet) for i in range(packets))
+    start = time.time()
+    sim.scheduler.run()
+    return time.time() - start
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("-p", "--packets", type="int", dest="packets",
+                      default=100000,
+                      help="packets to forward")
+    parser.add_option("-r", "--repeat", type="int", dest="repeat",
+                      default=3,
+                      help="runs per mode; the fastest is reported")
+    parser.add_option("--child", action="store_true", dest="child",
+                      default=False,
+                      help="print only the disabled-tracing time")
+    (options, args) = parser.parse_args()
+
+    runs = range(options.repeat)
+    if options.child:
+        print(min(forward(options.packets, False) for _ in runs))
+        return
+
+    disabled = min(forward(options.packets, False) for _ in runs)
+    # tracing enabled, with the output thrown away
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as sys.stdout:
+        enabled = min(forward(options.packets, True) for _ in runs)
+    sys.stdout = stdout
+    # the same run with tracing compiled out by python -O
+    stripped = float(subprocess.check_output([sys.executable, '-O', __file__, '--child',
+                                              '-p', str(options.packets), '-r', str(options.repeat)]))
+
+    print("%-22s %10s %12s" % ('tracing', 'seconds', 'us/packet'))
+    for name, seconds in (('enabled (to null)', enabled), ('disabled', disabled),
+                          ('stripped (python -O)', stripped)):
+        print("%-22s %10.3f %12.3f" % (name, seconds, 1e6 * seconds / options.packets))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+from __future__ import print_function
+
+import sys
+
+sys.path.append('..')
+
+from src import batch
+
+from networks.network import Network
+
+import optparse
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]",
+                                   description="Queueing delay of a Poisson source on one link, computed in batch")
+    parser.add_option("-l", "--load", type="float", dest="load",
+                      default=0.8,
+                      help="offered load as a fraction of the link rate")
+    parser.add_option("-d", "--duration", type="float", dest="duration",
+                      default=1000,
+                      help="seconds of traffic")
+    parser.add_option("-s", "--seed", type="int", dest="seed",
+                      default=1,
+                      help="random seed")
+    (options, args) = parser.parse_args()
+
+    # the n1 -> n2 link carries 1000-byte packets, as in delay.py
+    net = Network('../networks/one-hop.txt')
+    link = net.get_node('n1').get_link('n2')
+    service = 1000 * 8 / link.bandwidth
+    arrivals = batch.poisson(options.load / service, options.duration, seed=options.seed)
+    result = batch.run(arrivals, 1000, [link])
+
+    # mean waiting time of an M/D/1 queue
+    expected = options.load * service / (2 * (1 - options.load))
+    print("packets:", len(arrivals))
+    print("mean queueing delay: %.6f s (M/D/1: %.6f s)" % (result.queueing.mean(), expected))
+    print("mean end-to-end delay: %.6f s" % result.delays().mean())
+
+
+if __name__ == '__main__':
+    main()
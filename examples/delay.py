@@ -9,12 +9,11 @@ from src.packet import Packet
 
 from networks.network import Network
 
-import random
-
 
 class Generator(object):
     def __init__(self, node, destination, load, duration):
         self.node = node
+        self.sim = node.sim
         self.load = load
         self.destination = destination
         self.duration = duration
@@ -23,16 +22,16 @@ class Generator(object):
 
     def handle(self, event):
         # quit if done
-        now = Sim.scheduler.current_time()
+        now = self.sim.scheduler.current_time()
         if (now - self.start) > self.duration:
             return
 
         # generate a packet
         self.ident += 1
         p = Packet(destination_address=self.destination, ident=self.ident, protocol='delay', length=1000)
-        Sim.scheduler.add(delay=0, event=p, handler=self.node.send_packet)
+        self.sim.scheduler.add(delay=0, event=p, handler=self.node.send_packet)
         # schedule the next time we should generate a packet
-        Sim.scheduler.add(delay=random.expovariate(self.load), event='generate', handler=self.handle)
+        self.sim.scheduler.add(delay=self.sim.random.expovariate(self.load), event='generate', handler=self.handle)
 
 
 class DelayHandler(object):
@@ -55,10 +54,11 @@ def main():
     net = Network('../networks/one-hop.txt')
 
     # setup routes
+    net.routing()
+
+    # get nodes
     n1 = net.get_node('n1')
     n2 = net.get_node('n2')
-    n1.add_forwarding_entry(address=n2.get_address('n1'), link=n1.links[0])
-    n2.add_forwarding_entry(address=n1.get_address('n2'), link=n2.links[0])
 
     # setup app
     d = DelayHandler()
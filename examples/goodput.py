@@ -0,0 +1,96 @@
+from __future__ import print_function
+
+import sys
+
+sys.path.append('..')
+
+from src.sim import Simulation
+from src.sweep import Sweep
+from src.tcp import TCP
+from src.transport import Transport
+
+from networks import topology
+from networks.network import Network
+
+import optparse
+
+config = '../networks/one-hop.txt'
+
+
+class Receiver(object):
+    def __init__(self, sim):
+        self.sim = sim
+        self.received = 0
+        self.finished = 0
+
+    def receive_data(self, data):
+        self.received += len(data)
+        self.finished = self.sim.scheduler.current_time()
+
+
+def goodput(seed, loss, algorithm, size, window, delayed_ack):
+    """ Send size bytes over one link that loses the given fraction of
+        packets in each direction. Returns the goodput in bits per
+        second, the sender's retransmission statistics and the number
+        of ACKs the receiver sent. """
+    sim = Simulation(seed=seed)
+    net = Network(config, sim=sim)
+    net.loss(loss)
+
+    # setup routes
+    net.routing()
+
+    # get nodes
+    n1 = net.get_node('n1')
+    n2 = net.get_node('n2')
+
+    # setup connection
+    receiver = Receiver(sim)
+    c1 = TCP(Transport(n1), n1.get_address('n2'), 1, n2.get_address('n1'), 1,
+             window=window, congestion=algorithm)
+    c2 = TCP(Transport(n2), n2.get_address('n1'), 1, n1.get_address('n2'), 1, receiver,
+             window=window, congestion=algorithm, delayed_ack=delayed_ack)
+
+    sim.scheduler.add(delay=0, event=bytes(size), handler=c1.send)
+    sim.scheduler.run()
+    return {'goodput': 8.0 * receiver.received / receiver.finished,
+            'retransmissions': c1.retransmissions,
+            'timeouts': c1.timeouts,
+            'acks': c2.acks_sent}
+
+
+def setup():
+    topology.load(config)
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("-w", "--workers", type="int", dest="workers",
+                      default=None,
+                      help="worker processes (default: one per core)")
+    parser.add_option("-s", "--seeds", type="int", dest="seeds",
+                      default=5,
+                      help="runs per parameter point")
+    parser.add_option("-b", "--bytes", type="int", dest="size",
+                      default=200000,
+                      help="bytes to transfer")
+    parser.add_option("-W", "--window", type="int", dest="window",
+                      default=64000,
+                      help="send window in bytes")
+    parser.add_option("-d", "--delayed-ack", action="store_true", dest="delayed_ack",
+                      default=False,
+                      help="receiver delays ACKs")
+    (options, args) = parser.parse_args()
+
+    grid = {'loss': [0.0, 0.001, 0.01, 0.02, 0.05, 0.1],
+            'algorithm': ['reno', 'newreno', 'cubic'],
+            'size': [options.size],
+            'window': [options.window],
+            'delayed_ack': [options.delayed_ack]}
+    sweep = Sweep(goodput, grid, seeds=options.seeds, workers=options.workers, setup=setup)
+    results = sweep.run()
+    print(results.format())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+from __future__ import print_function
+
+import sys
+
+sys.path.append('..')
+
+from src.sim import Simulation
+from src.sweep import Sweep
+
+from networks import topology
+from networks.network import Network
+
+from delay import Generator
+
+import optparse
+
+config = '../networks/one-hop.txt'
+
+
+class DelayStats(object):
+    def __init__(self, sim):
+        self.sim = sim
+        self.packets = 0
+        self.total = 0.0
+
+    def receive_packet(self, packet):
+        self.packets += 1
+        self.total += self.sim.scheduler.current_time() - packet.created
+
+
+def delay(seed, load, duration):
+    """ The examples/delay.py scenario: a Poisson source sending 1000
+        byte packets over one link at the given fraction of its
+        capacity. Returns the mean end-to-end delay. """
+    sim = Simulation(seed=seed)
+    net = Network(config, sim=sim)
+
+    # setup routes
+    net.routing()
+
+    # get nodes
+    n1 = net.get_node('n1')
+    n2 = net.get_node('n2')
+
+    # setup app
+    stats = DelayStats(sim)
+    n2.add_protocol(protocol="delay", handler=stats)
+
+    # setup packet generator
+    max_rate = n1.links[0].bandwidth // (1000 * 8)
+    g = Generator(node=n1, destination=n2.get_address('n1'), load=load * max_rate, duration=duration)
+    sim.scheduler.add(delay=0, event='generate', handler=g.handle)
+
+    sim.scheduler.run()
+    return {'delay': stats.total / stats.packets, 'packets': stats.packets}
+
+
+def setup():
+    topology.load(config)
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("-w", "--workers", type="int", dest="workers",
+                      default=None,
+                      help="worker processes (default: one per core)")
+    parser.add_option("-s", "--seeds", type="int", dest="seeds",
+                      default=10,
+                      help="runs per parameter point")
+    parser.add_option("-d", "--duration", type="float", dest="duration",
+                      default=10,
+                      help="simulated seconds per run")
+    (options, args) = parser.parse_args()
+
+    grid = {'load': [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9],
+            'duration': [options.duration]}
+    sweep = Sweep(delay, grid, seeds=options.seeds, workers=options.workers, setup=setup)
+    results = sweep.run()
+    print(results.format())
+
+
+if __name__ == '__main__':
+    main()
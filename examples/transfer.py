@@ -25,7 +25,7 @@ class AppHandler(object):
         self.f = open(os.path.join(self.directory, self.filename), 'wb')
 
     def receive_data(self, data):
-        Sim.trace('AppHandler', "application got %d bytes" % (len(data)))
+        Sim.trace('AppHandler', "application got %d bytes", len(data))
         self.f.write(data)
         self.f.flush()
 
@@ -77,10 +77,11 @@ class Main(object):
         net.loss(self.loss)
 
         # setup routes
+        net.routing()
+
+        # get nodes
         n1 = net.get_node('n1')
         n2 = net.get_node('n2')
-        n1.add_forwarding_entry(address=n2.get_address('n1'), link=n1.links[0])
-        n2.add_forwarding_entry(address=n1.get_address('n2'), link=n2.links[0])
 
         # setup transport
         t1 = Transport(n1)
@@ -95,11 +96,8 @@ class Main(object):
 
         # send a file
         with open(self.filename, 'rb') as f:
-            while True:
-                data = f.read(1000)
-                if not data:
-                    break
-                Sim.scheduler.add(delay=0, event=data, handler=c1.send)
+            chunks = iter(lambda: f.read(1000), b'')
+            Sim.scheduler.add_many((0, data, c1.send) for data in chunks)
 
         # run the simulation
         Sim.scheduler.run()
@@ -0,0 +1,130 @@
+""" Synthetic topologies. Every generator returns a Topology that can be
+    passed to Network in place of a configuration file or written out
+    with Topology.write. Links are added in both directions and the
+    keyword arguments (bandwidth, propagation, queue_size, loss) are set
+    on all of them; generators with several kinds of links take a
+    separate set of attributes for the distinguished ones. """
+
+import math
+import random
+
+from networks.topology import Topology
+
+
+def tree(k, depth, **attributes):
+    """ A complete k-ary tree with the given number of levels below the
+        root. Nodes are named t0 (the root), t1, ... in breadth-first
+        order. """
+    topology = Topology()
+    count = 1
+    level = 1
+    for _ in range(depth):
+        level *= k
+        count += level
+    for i in range(count):
+        topology.add_node('t%d' % i)
+    for i in range(1, count):
+        topology.add_link('t%d' % ((i - 1) // k), 't%d' % i, **attributes)
+    return topology
+
+
+def dumbbell(hosts, bottleneck=None, **attributes):
+    """ Two routers, left and right, joined by one bottleneck link, with
+        hosts hosts on each side (l0, l1, ... and r0, r1, ...).
+        bottleneck is a dictionary of attributes for the link between
+        the routers. """
+    topology = Topology()
+    topology.add_node('left')
+    topology.add_node('right')
+    topology.add_link('left', 'right', **(bottleneck or attributes))
+    for side, router in (('l', 'left'), ('r', 'right')):
+        for i in range(hosts):
+            name = '%s%d' % (side, i)
+            topology.add_node(name)
+            topology.add_link(router, name, **attributes)
+    return topology
+
+
+def fat_tree(k, **attributes):
+    """ A k-ary fat tree (Al-Fares et al., 2008) for an even k: (k/2)^2
+        core switches c<i>, and k pods of k/2 aggregation switches
+        a<pod>_<i> and k/2 edge switches e<pod>_<i>, each edge switch
+        with k/2 hosts h<pod>_<i>_<j>. """
+    if k % 2:
+        raise ValueError("a fat tree needs an even k, not %d" % k)
+    half = k // 2
+    topology = Topology()
+    for i in range(half * half):
+        topology.add_node('c%d' % i)
+    for pod in range(k):
+        for i in range(half):
+            aggregation = 'a%d_%d' % (pod, i)
+            topology.add_node(aggregation)
+            for j in range(half):
+                topology.add_link(aggregation, 'c%d' % (i * half + j), **attributes)
+        for i in range(half):
+            edge = 'e%d_%d' % (pod, i)
+            topology.add_node(edge)
+            for j in range(half):
+                topology.add_link(edge, 'a%d_%d' % (pod, j), **attributes)
+            for j in range(half):
+                host = 'h%d_%d_%d' % (pod, i, j)
+                topology.add_node(host)
+                topology.add_link(edge, host, **attributes)
+    return topology
+
+
+def erdos_renyi(n, p, seed=None, **attributes):
+    """ A G(n, p) random graph on nodes n0 ... n<n-1>: every pair of
+        nodes is linked with probability p. Uses the method of Batagelj
+        and Brandes (2005), which skips over absent edges, so it takes
+        time proportional to the number of edges rather than n^2. """
+    generator = random.Random(seed)
+    topology = Topology()
+    for i in range(n):
+        topology.add_node('n%d' % i)
+    if p <= 0:
+        return topology
+    if p >= 1:
+        for v in range(n):
+            for w in range(v):
+                topology.add_link('n%d' % v, 'n%d' % w, **attributes)
+        return topology
+    logq = math.log(1 - p)
+    v = 1
+    w = -1
+    while v < n:
+        w += 1 + int(math.log(1 - generator.random()) / logq)
+        while w >= v and v < n:
+            w -= v
+            v += 1
+        if v < n:
+            topology.add_link('n%d' % v, 'n%d' % w, **attributes)
+    return topology
+
+
+def barabasi_albert(n, m, seed=None, **attributes):
+    """ A preferential-attachment graph on nodes n0 ... n<n-1>: starting
+        from m unconnected nodes, every new node links to m distinct
+        existing nodes chosen with probability proportional to their
+        degree. """
+    if not 1 <= m < n:
+        raise ValueError("need 1 <= m < n, not m=%d, n=%d" % (m, n))
+    generator = random.Random(seed)
+    topology = Topology()
+    for i in range(n):
+        topology.add_node('n%d' % i)
+    # every node appears once per link end, so a uniform choice from
+    # this list is a choice proportional to degree
+    ends = []
+    targets = list(range(m))
+    for v in range(m, n):
+        for w in targets:
+            topology.add_link('n%d' % v, 'n%d' % w, **attributes)
+        ends.extend(targets)
+        ends.extend([v] * m)
+        chosen = set()
+        while len(chosen) < m:
+            chosen.add(generator.choice(ends))
+        targets = sorted(chosen)
+    return topology
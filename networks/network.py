@@ -1,4 +1,3 @@
-import re
 import sys
 
 sys.path.append('..')
@@ -6,94 +5,122 @@ sys.path.append('..')
 from src.link import Link
 from src.node import Node
 
+from networks import routing, topology
+
 
 class Network(object):
-    def __init__(self, config):
+    def __init__(self, config, sim=None, hierarchical=False):
+        """ config is the path of a configuration file or a Topology,
+            e.g. from networks.generators.
+
+            By default link i of the configuration gets address i + 1.
+            If hierarchical is set, addresses are structured instead:
+            nodes are numbered in breadth-first order and the addresses
+            of a node's links are its number followed by the link's
+            position at the node, so that each node is covered by one
+            prefix (Node.prefix) and nearby nodes by shorter ones. That
+            keeps forwarding tables built by routing small. """
         self.config = config
+        self.sim = sim
         self.nodes = {}
         self.address = 1
+        self.hierarchical = hierarchical
         self.build()
 
     def build(self):
-        state = 'network'
-        with open(self.config) as f:
-            for line in f.readlines():
-                if line.startswith('#'):
-                    continue
-                if line.strip() == "":
-                    state = 'links'
-                if state == 'network':
-                    self.create_network(line)
-                elif state == 'links':
-                    self.configure_link(line)
-
-    def create_network(self, line):
-        fields = line.split()
-        if len(fields) < 2:
-            return
-        start = self.get_node(fields[0])
-        for i in range(1, len(fields)):
-            end = self.get_node(fields[i])
-            l = Link(self.address, start, endpoint=end)
-            self.address += 1
-            start.add_link(l)
-
-    def configure_link(self, line):
-        fields = line.split()
-        if len(fields) < 3:
-            return
-        start = self.get_node(fields[0])
-        l = start.get_link(fields[1])
-        for i in range(2, len(fields)):
-            if fields[i].endswith("bps"):
-                self.set_bandwidth(l, fields[i])
-            if fields[i].endswith("ms"):
-                self.set_delay(l, fields[i])
-            if fields[i].endswith("seconds"):
-                self.set_delay(l, fields[i])
-            if fields[i].endswith("pkts"):
-                self.set_queue(l, fields[i])
-            if fields[i].endswith("loss"):
-                self.set_loss(l, fields[i])
+        parsed = topology.load(self.config)
+        for name in parsed.nodes:
+            self.get_node(name)
+        if self.hierarchical:
+            self.number_nodes(parsed)
+        for start, end in parsed.links:
+            self.create_link(self.get_node(start), self.get_node(end))
+        for start, end, attributes in parsed.settings:
+            self.configure_link(self.get_node(start).get_link(end), attributes)
+
+    def number_nodes(self, parsed):
+        degree = dict((name, 0) for name in parsed.nodes)
+        for start, end in parsed.links:
+            degree[start] += 1
+        # bits for the link number within a node; 0 is not used
+        self.link_bits = (max(degree.values()) + 1).bit_length()
+        order = parsed.breadth_first()
+        if len(order).bit_length() + self.link_bits > 32:
+            raise ValueError("%d nodes don't fit in hierarchical 32-bit addresses" % len(order))
+        for number, name in enumerate(order):
+            self.nodes[name].prefix = (number, 32 - self.link_bits)
+
+    def create_link(self, start, end):
+        if self.hierarchical:
+            address = (start.prefix[0] << self.link_bits) | (len(start.links) + 1)
+        else:
+            address = self.address
+        l = Link(address, start, endpoint=end, sim=self.sim)
+        self.address += 1
+        start.add_link(l)
+
+    @staticmethod
+    def configure_link(link, attributes):
+        for name, value in attributes.items():
+            setattr(link, name, value)
 
     def get_node(self, name):
         if name not in self.nodes:
-            self.nodes[name] = Node(name)
+            self.nodes[name] = Node(name, sim=self.sim)
         return self.nodes[name]
 
+    def discipline(self, factory):
+        """ Give every link a new queue, made by calling factory with
+            the link's queue size, e.g. net.discipline(queues.CoDel). """
+        for node in self.nodes.values():
+            for link in node.links:
+                link.set_queue(factory(link.queue_size))
+
+    def analytic(self, analytic=True):
+        """ Switch every link to or from analytic mode (see Link). """
+        for node in self.nodes.values():
+            for link in node.links:
+                link.analytic = analytic
+
+    def routing(self, metric='hops', eager=False):
+        """ Route packets along shortest paths and return the Router
+            (see networks.routing). Routes are computed on demand unless
+            eager is set, in which case they are also aggregated. The
+            router replaces the one from an earlier call. """
+        router = routing.Router(self, metric)
+        if eager:
+            router.compute()
+            router.aggregate()
+        return router
+
     def loss(self, loss):
         for node in self.nodes.values():
             for link in node.links:
                 link.loss = loss
 
+    # The setters below are kept for code written against the old
+    # line-by-line parser. Each takes a configuration field such as
+    # '10Mbps' and sets the link attribute if the unit matches.
+
     def set_bandwidth(self, link, rate):
-        numeric_rate = self.convert(rate)
-        if rate.endswith("Gbps"):
-            link.bandwidth = numeric_rate * 1000000000
-        elif rate.endswith("Mbps"):
-            link.bandwidth = numeric_rate * 1000000
-        elif rate.endswith("Kbps"):
-            link.bandwidth = numeric_rate * 1000
-        elif rate.endswith("bps"):
-            link.bandwidth = numeric_rate
+        self.set_field(link, 'bandwidth', rate)
 
     def set_delay(self, link, delay):
-        numeric_delay = self.convert(delay)
-        if delay.endswith("ms"):
-            link.propagation = numeric_delay / 1000.0
-        if delay.endswith("seconds"):
-            link.propagation = numeric_delay
+        self.set_field(link, 'propagation', delay)
 
     def set_queue(self, link, size):
-        numeric_size = self.convert(size)
-        if size.endswith("pkts"):
-            link.queue_size = numeric_size
+        self.set_field(link, 'queue_size', size)
 
     def set_loss(self, link, loss):
-        numeric_loss = self.convert(loss)
-        if loss.endswith("loss"):
-            link.loss = numeric_loss
+        self.set_field(link, 'loss', loss)
+
+    @staticmethod
+    def set_field(link, name, field):
+        attributes = topology.Topology.parse_attributes([field])
+        if name in attributes:
+            setattr(link, name, attributes[name])
 
     @staticmethod
     def convert(value):
-        return float(re.sub("[^0-9.]", "", value))
+        return float(value.rstrip(topology.letters))
+
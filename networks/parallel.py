@@ -0,0 +1,314 @@
+import multiprocessing
+import sys
+
+sys.path.append('..')
+
+from src.link import Link
+from src.scheduler import NodeScheduler, owner
+from src.sim import Simulation
+
+from networks import topology
+from networks.network import Network
+
+
+class RemoteNode(object):
+    """ Stand-in for a node that is simulated by another partition. It
+        takes the place of the endpoint of every link that leaves the
+        local partition; packets sent to it are turned into messages. """
+
+    def __init__(self, hostname, partition):
+        self.hostname = hostname
+        self.partition = partition
+
+    def receive_packet(self, packet):
+        raise RuntimeError("%s is simulated by partition %d" % (self.hostname, self.partition))
+
+
+class PartitionScheduler(NodeScheduler):
+    """ Scheduler for one partition of a parallel simulation.
+
+        Simultaneous events are ordered as by a NodeScheduler, by the
+        node that scheduled them and how many events it had scheduled
+        before. Each node's events all run in one partition, so the
+        keys, and with them the order of all events, are exactly those
+        of a sequential run with a NodeScheduler. Messages carry the key
+        their event got in the sending partition.
+
+        Events whose handler belongs to a RemoteNode are not queued but
+        collected in the outbox, as (partition, time, key, hostname,
+        packet) messages. While the set of local hostnames is given,
+        events for nodes outside it are dropped, so the partition can
+        run the same setup code as a sequential simulation.
+
+        A link going down or up changes the routes of every partition,
+        so those events run everywhere. Each partition keeps the ones
+        scheduled during setup; one scheduled while the simulation runs
+        is also sent to all other partitions, as a message whose
+        hostname is (start, end, 'down' or 'up'). Like a packet, it can
+        only be sent for a time the other partitions haven't reached,
+        at least the lookahead ahead. """
+
+    def __init__(self, local=None, backend='heap'):
+        NodeScheduler.__init__(self, backend)
+        self.local = local
+        self.outbox = []
+        self.nodes = {}
+        # numbers of the other partitions
+        self.others = []
+        # end of the window being run
+        self.end = 0
+
+    def add(self, delay, event, handler):
+        return self.add_at(self.current + delay, event, handler)
+
+    def add_at(self, time, event, handler):
+        key = self.key()
+        target = getattr(handler, '__self__', None)
+        if target.__class__ is RemoteNode:
+            if event.body.__class__ is memoryview:
+                # views of a send buffer can't be pickled
+                event.body = event.body.tobytes()
+            self.outbox.append((target.partition, time, key, target.hostname, event))
+            return None
+        entry = [time, key, event, handler]
+        function = getattr(handler, '__func__', None)
+        if function is Link.down or function is Link.up:
+            if self.local is None:
+                self.broadcast(time, key, target, function.__name__, event)
+            self.queue.push(entry)
+            return entry
+        if self.local is not None:
+            hostname = owner(target)
+            if hostname is not None and hostname not in self.local:
+                return entry
+        self.queue.push(entry)
+        return entry
+
+    def add_many(self, events):
+        return [self.add(delay, event, handler) for delay, event, handler in events]
+
+    def broadcast(self, time, key, link, change, event):
+        """ Send a link going down or up to the other partitions. """
+        if time < self.end:
+            raise RuntimeError("a link can only go %s at least the lookahead after the event "
+                               "that schedules it (at %r, before %r)" % (change, time, self.end))
+        target = (link.startpoint.hostname, link.endpoint.hostname, change)
+        for number in self.others:
+            self.outbox.append((number, time, key, target, event))
+
+    def post(self, time, key, hostname, event):
+        """ Queue the arrival of a packet sent by another partition, or
+            a link going down or up. """
+        if hostname.__class__ is tuple:
+            start, end, change = hostname
+            handler = getattr(self.nodes[start].get_link(end), change)
+        else:
+            handler = self.nodes[hostname].receive_packet
+        entry = [time, key, event, handler]
+        self.queue.push(entry)
+
+    def next_time(self):
+        """ Return the time of the next event, or None if there is none. """
+        queue = self.queue
+        while queue:
+            entry = queue.peek()
+            if entry[3] is not None:
+                return entry[0]
+            queue.pop()
+            self.cancelled -= 1
+        return None
+
+    def run_window(self, end, until=None):
+        """ Run every event scheduled before end (and not after until). """
+        self.end = end
+        while True:
+            time = self.next_time()
+            if time is None or time >= end or (until is not None and time > until):
+                return
+            self.step()
+
+
+class Partition(object):
+    """ One partition of a parallel simulation. It builds the whole
+        network but only simulates the nodes assigned to it. """
+
+    def __init__(self, number, config, assignment, setup, seed=None, args=()):
+        self.number = number
+        self.local = set(name for name, part in assignment.items() if part == number)
+        self.sim = Simulation(seed=seed)
+        self.sim.scheduler = PartitionScheduler(self.local)
+        self.sim.scheduler.others = sorted(set(assignment.values()) - set([number]))
+        self.net = Network(config, sim=self.sim)
+        # the setup function configures routes and applications and
+        # schedules the initial events, of which the scheduler keeps
+        # those of the local nodes
+        self.result = setup(self.sim, self.net, self.local, *args)
+        self.sim.scheduler.local = None
+        for name, node in self.net.nodes.items():
+            self.sim.scheduler.nodes[name] = node
+            if name not in self.local:
+                continue
+            for link in node.links:
+                hostname = link.endpoint.hostname
+                if hostname not in self.local:
+                    link.endpoint = RemoteNode(hostname, assignment[hostname])
+
+    def next_time(self):
+        return self.sim.scheduler.next_time()
+
+    def window(self, end, until, messages):
+        """ Accept messages from other partitions, run one window and
+            return the outgoing messages and the time of the next local
+            event. """
+        scheduler = self.sim.scheduler
+        for message in messages:
+            scheduler.post(*message)
+        scheduler.run_window(end, until)
+        outbox = scheduler.outbox
+        scheduler.outbox = []
+        return outbox, scheduler.next_time()
+
+
+def serve(connection, *args):
+    """ Main loop of a worker process running one partition. """
+    partition = Partition(*args)
+    connection.send(partition.next_time())
+    while True:
+        command = connection.recv()
+        if command[0] == 'window':
+            connection.send(partition.window(*command[1:]))
+        else:
+            connection.send(partition.result)
+            connection.close()
+            return
+
+
+class InlinePartition(object):
+    """ Runs a partition in the calling process, behind the same
+        interface as a worker process. Useful for debugging. """
+
+    def __init__(self, *args):
+        self.partition = Partition(*args)
+        self.reply = self.partition.next_time()
+
+    def send(self, command):
+        if command[0] == 'window':
+            self.reply = self.partition.window(*command[1:])
+        else:
+            self.reply = self.partition.result
+
+    def recv(self):
+        return self.reply
+
+
+def partition(config, count):
+    """ Split the nodes of a network into count partitions of nearly
+        equal size. Nodes are taken in breadth-first order, so each
+        partition is a connected region and few links are cut. Returns
+        a dictionary mapping hostnames to partition numbers. """
+    order = topology.load(config).breadth_first()
+    return dict((name, i * count // len(order)) for i, name in enumerate(order))
+
+
+class ParallelSimulation(object):
+    """ Conservative parallel simulation of a network, split into
+        partitions that each run in their own process.
+
+        Packets that cross from one partition to another travel as
+        timestamped messages. The partitions advance in lock-step
+        windows (YAWNS): every window starts at the earliest pending
+        event or message anywhere and is as long as the lookahead, the
+        smallest propagation delay of a link between two partitions. No
+        message sent during a window can arrive inside it, so each
+        partition can run its window without further synchronization.
+
+        setup is called in every partition as setup(sim, net, local,
+        *args), where local is the set of hostnames the partition
+        simulates. It should set up the whole network just as it would
+        for a sequential run; initial events are kept only by the
+        partition that owns the node their handler belongs to (the
+        handler's object itself, or its node or startpoint attribute).
+        The return value of setup is sent back to the coordinator when
+        the run ends, so it must be picklable. Links going down or up
+        (Link.down, Link.up) are simulated in every partition, so all
+        routers see them; one scheduled during the run must be at least
+        the lookahead ahead (see PartitionScheduler).
+
+        Given the same seed, results match a sequential run of the same
+        setup whose scheduler is a src.scheduler.NodeScheduler. The
+        partitions need its node-keyed order of simultaneous events;
+        with the default Scheduler, which orders them by insertion, a
+        sequential run may only differ in the order of simultaneous
+        events at different nodes. Link loss comes from per-link random
+        streams (Link.stream), so it matches too; other random numbers
+        should be drawn from streams as well. """
+
+    def __init__(self, config, setup, partitions=2, assignment=None, seed=None,
+                 args=(), processes=True):
+        self.config = config
+        self.setup = setup
+        self.assignment = assignment or partition(config, partitions)
+        self.partitions = max(self.assignment.values()) + 1
+        self.seed = seed
+        self.args = args
+        self.processes = processes
+        self.lookahead = self.find_lookahead()
+        self.windows = 0
+
+    def find_lookahead(self):
+        lookahead = float('inf')
+        net = Network(self.config, sim=Simulation())
+        for name, node in net.nodes.items():
+            for link in node.links:
+                if self.assignment[name] != self.assignment[link.endpoint.hostname]:
+                    lookahead = min(lookahead, link.propagation)
+        if lookahead <= 0:
+            raise ValueError("links between partitions need a positive propagation delay")
+        return lookahead
+
+    def start(self):
+        workers = []
+        processes = []
+        for number in range(self.partitions):
+            args = (number, self.config, self.assignment, self.setup, self.seed, self.args)
+            if not self.processes:
+                workers.append(InlinePartition(*args))
+                continue
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=serve, args=(child,) + args)
+            process.daemon = True
+            process.start()
+            workers.append(parent)
+            processes.append(process)
+        return workers, processes
+
+    def run(self, until=None):
+        """ Run the simulation and return the setup results of all
+            partitions, in partition order. """
+        workers, processes = self.start()
+        next_times = [worker.recv() for worker in workers]
+        inboxes = [[] for _ in workers]
+        while True:
+            times = [time for time in next_times if time is not None]
+            times.extend(message[1] for inbox in inboxes for message in inbox)
+            if not times:
+                break
+            start = min(times)
+            if until is not None and start > until:
+                break
+            end = start + self.lookahead
+            self.windows += 1
+            for number, worker in enumerate(workers):
+                worker.send(('window', end, until, [message[1:] for message in inboxes[number]]))
+                inboxes[number] = []
+            for number, worker in enumerate(workers):
+                outbox, next_times[number] = worker.recv()
+                for message in outbox:
+                    inboxes[message[0]].append(message)
+        results = []
+        for worker in workers:
+            worker.send(('finish',))
+            results.append(worker.recv())
+        for process in processes:
+            process.join()
+        return results
@@ -0,0 +1,247 @@
+import collections
+import heapq
+import itertools
+
+# link cost functions for Router
+metrics = {
+    'hops': None,
+    'delay': lambda link: link.propagation,
+    'bandwidth': lambda link: 1.0 / link.bandwidth,
+}
+
+
+class Router(object):
+    """ Shortest-path routing for all the nodes of a Network.
+
+        Routes are computed per destination node: one breadth-first
+        search (for hop counts) or Dijkstra search (for other metrics)
+        backwards from the destination gives every other node its next
+        hop towards it, and fills in the entries for all of the
+        destination's addresses in the forwarding tables of every node,
+        or a single prefix if the network assigns addresses
+        hierarchically.
+        metric is 'hops', 'delay' (propagation delay), 'bandwidth'
+        (inverse bandwidth) or a function giving the cost of a link.
+        Links that are down are not used.
+
+        By default routes are computed lazily: a node that has no entry
+        for a packet's destination asks the router, which then computes
+        the routes to that destination. This keeps large networks cheap
+        when traffic only goes to some of the nodes. compute() computes
+        the routes to every node up front. aggregate() shrinks the
+        forwarding tables by merging routes for adjacent prefixes.
+
+        When a link goes down or comes back up, only the destinations
+        whose routes it changes are recomputed: those whose routes used
+        the link, or those it gives a shorter route to. The router
+        replaces any forwarding entries for the addresses it routes, and
+        keeps the routes only there, so its memory doesn't grow with the
+        square of the number of nodes beyond the tables themselves.
+
+        A network has one router: a new one (e.g. from calling
+        Network.routing again) removes the routes of the previous one
+        and takes over from it. """
+
+    def __init__(self, net, metric='hops'):
+        self.net = net
+        self.cost = metrics[metric] if metric in metrics else metric
+        # the node each address belongs to
+        self.owners = {}
+        # links into each node
+        self.incoming = collections.defaultdict(list)
+        for node in net.nodes.values():
+            for link in node.links:
+                self.owners[link.address] = node
+                self.incoming[net.nodes[link.endpoint.hostname]].append(link)
+        # destinations whose routes are installed; the routes themselves
+        # are only kept in the forwarding tables
+        self.routed = set()
+        # running links into each node with their costs (see arcs())
+        self.graph = None
+        # a network has one router: a new one takes over from the last
+        previous = set(node.router for node in net.nodes.values() if node.router is not None)
+        for router in previous:
+            router.detach()
+        for node in net.nodes.values():
+            node.router = self
+            for link in node.links:
+                link.watchers.append(self.link_changed)
+
+    def detach(self):
+        """ Remove the routes this router installed and stop following
+            link changes. """
+        for destination in list(self.routed):
+            self.clear(destination)
+        for node in self.net.nodes.values():
+            if node.router is self:
+                node.router = None
+            for link in node.links:
+                if self.link_changed in link.watchers:
+                    link.watchers.remove(self.link_changed)
+
+    def compute(self):
+        """ Compute the routes to every node. This does the same searches
+            as update(), but fills in every forwarding table at once
+            rather than one entry at a time. Only the next hops are
+            kept, in the tables; each search's distances are dropped as
+            soon as it is done. """
+        nodes = list(self.net.nodes.values())
+        # every node's next hop towards each destination, by position in
+        # nodes
+        columns = dict((node, [None] * len(nodes)) for node in nodes)
+        # the prefixes of each length and the positions of their nodes
+        prefixes = collections.defaultdict(list)
+        for number, destination in enumerate(nodes):
+            self.clear(destination)
+            self.routed.add(destination)
+            _, next_hop = self.search(destination)
+            for node, link in next_hop.items():
+                columns[node][number] = link
+            for prefix, length in self.prefixes(destination):
+                prefixes[length].append((prefix, number))
+        for length, entries in prefixes.items():
+            routes = [prefix for prefix, _ in entries]
+            numbers = [number for _, number in entries]
+            for node in nodes:
+                links = list(map(columns[node].__getitem__, numbers))
+                table = dict(itertools.compress(zip(routes, links), links))
+                node.forwarding_table.extend(table, length)
+
+    def aggregate(self):
+        """ Merge routes in every forwarding table (see
+            ForwardingTable.aggregate). """
+        for node in self.net.nodes.values():
+            node.forwarding_table.aggregate()
+
+    def resolve(self, node, address):
+        """ Return the link node should forward packets for address on,
+            computing the routes to its destination if needed, or None if
+            there is no route. """
+        destination = self.owners.get(address)
+        if destination is None or destination in self.routed:
+            return None
+        self.update(destination)
+        return node.forwarding_table.lookup(address)
+
+    def arcs(self):
+        """ Return the running links into every node, as (start, cost,
+            link) with the link's startpoint and cost. They are kept
+            until a link goes down or up. """
+        if self.graph is None:
+            cost = self.cost
+            self.graph = {}
+            for node, links in self.incoming.items():
+                self.graph[node] = [(link.startpoint, 1 if cost is None else cost(link), link)
+                                    for link in links if link.running]
+        return self.graph
+
+    def search(self, destination):
+        """ Return the distance and next hop towards destination of
+            every node that can reach it. """
+        distance = {destination: 0}
+        next_hop = {}
+        arcs = self.arcs()
+        if self.cost is None:
+            queue = collections.deque([destination])
+            while queue:
+                node = queue.popleft()
+                hops = distance[node] + 1
+                for start, _, link in arcs.get(node, ()):
+                    if start not in distance:
+                        distance[start] = hops
+                        next_hop[start] = link
+                        queue.append(start)
+            return distance, next_hop
+        done = set()
+        heap = [(0, 0, destination)]
+        count = 1
+        while heap:
+            length, _, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            for start, cost, link in arcs.get(node, ()):
+                total = length + cost
+                if start not in distance or total < distance[start]:
+                    distance[start] = total
+                    next_hop[start] = link
+                    heapq.heappush(heap, (total, count, start))
+                    count += 1
+        return distance, next_hop
+
+    def distances(self, source, skip=None):
+        """ Return the distance from source to every node it can reach,
+            over running links other than skip. """
+        nodes = self.net.nodes
+        cost = self.cost
+        distance = {source: 0}
+        done = set()
+        heap = [(0, 0, source)]
+        count = 1
+        while heap:
+            length, _, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            for link in node.links:
+                if link is skip or not link.running:
+                    continue
+                end = nodes[link.endpoint.hostname]
+                total = length + (1 if cost is None else cost(link))
+                if end not in distance or total < distance[end]:
+                    distance[end] = total
+                    heapq.heappush(heap, (total, count, end))
+                    count += 1
+        return distance
+
+    def update(self, destination):
+        """ (Re)compute the routes to destination and install them. """
+        self.routed.add(destination)
+        _, next_hop = self.search(destination)
+        prefixes = self.prefixes(destination)
+        for node in self.net.nodes.values():
+            table = node.forwarding_table
+            link = next_hop.get(node)
+            for prefix, length in prefixes:
+                if link is None:
+                    table.remove(prefix, length)
+                else:
+                    table.add(prefix, length, link)
+
+    def clear(self, destination):
+        """ Remove the routes to destination. """
+        if destination not in self.routed:
+            return
+        self.routed.discard(destination)
+        prefixes = self.prefixes(destination)
+        for node in self.net.nodes.values():
+            table = node.forwarding_table
+            for prefix, length in prefixes:
+                table.remove(prefix, length)
+
+    @staticmethod
+    def prefixes(node):
+        """ Return the prefixes that cover a node's addresses. """
+        if node.prefix is not None:
+            return [node.prefix]
+        return [(address, 32) for address in node.addresses]
+
+    def link_changed(self, link):
+        """ Recompute the routes a link going down or up affects. A link
+            that went down affects the destinations its startpoint routed
+            over it; one that came up those it is a shorter way to, found
+            with a search from each of its ends. """
+        self.graph = None
+        start = link.startpoint
+        if not link.running:
+            table = start.forwarding_table
+            affected = [destination for destination in self.routed if destination.addresses
+                        and table.lookup(min(destination.addresses)) is link]
+        else:
+            cost = 1 if self.cost is None else self.cost(link)
+            before = self.distances(start, skip=link)
+            after = self.distances(self.net.nodes[link.endpoint.hostname])
+            affected = [destination for destination in self.routed if destination in after
+                        and (destination not in before or after[destination] + cost < before[destination])]
+        for destination in affected:
+            self.update(destination)
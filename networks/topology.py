@@ -0,0 +1,260 @@
+import array
+import collections
+import math
+import os
+import string
+import struct
+import tempfile
+
+
+class Topology(object):
+    """ Parsed description of a network configuration file. The nodes
+        are listed in the order they first appear, the links in the
+        order they are declared (link i gets address i + 1), and the
+        link settings in the order they are configured, as
+        (start, end, attributes) with attributes mapping Link attribute
+        names to numeric values. """
+
+    def __init__(self):
+        self.nodes = []
+        self.links = []
+        self.settings = []
+
+    def breadth_first(self):
+        """ Return the nodes in breadth-first order, treating links as
+            undirected, so that nodes close to each other in the network
+            are also close in the list. """
+        neighbors = collections.defaultdict(list)
+        for start, end in self.links:
+            neighbors[start].append(end)
+            neighbors[end].append(start)
+        order = []
+        seen = set()
+        for root in self.nodes:
+            if root in seen:
+                continue
+            seen.add(root)
+            queue = collections.deque([root])
+            while queue:
+                name = queue.popleft()
+                order.append(name)
+                for neighbor in neighbors[name]:
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        queue.append(neighbor)
+        return order
+
+    @staticmethod
+    def parse(config):
+        topology = Topology()
+        seen = set()
+        state = 'network'
+        with open(config) as f:
+            for line in f:
+                if line.startswith('#'):
+                    continue
+                if line.strip() == "":
+                    state = 'links'
+                fields = line.split()
+                if state == 'network':
+                    if len(fields) < 2:
+                        continue
+                    for name in fields:
+                        if name not in seen:
+                            seen.add(name)
+                            topology.nodes.append(name)
+                    for name in fields[1:]:
+                        topology.links.append((fields[0], name))
+                elif state == 'links':
+                    if len(fields) < 3:
+                        continue
+                    topology.settings.append((fields[0], fields[1], Topology.parse_attributes(fields[2:])))
+        return topology
+
+    @staticmethod
+    def parse_attributes(fields):
+        attributes = {}
+        for field in fields:
+            number = field.rstrip(letters)
+            unit = units.get(field[len(number):])
+            if unit is not None:
+                attributes[unit[0]] = unit[1](float(number))
+        return attributes
+
+    def add_node(self, name):
+        self.nodes.append(name)
+
+    def add_link(self, start, end, **attributes):
+        """ Add links in both directions between two nodes, with the
+            given Link attributes. """
+        self.links.append((start, end))
+        self.links.append((end, start))
+        if attributes:
+            self.settings.append((start, end, attributes))
+            self.settings.append((end, start, dict(attributes)))
+
+    def write(self, path):
+        """ Write the topology as a configuration file. Parsing the file
+            gives the same links and settings in the same order; nodes
+            without links are left out and the others are listed in the
+            order they first appear in a link. Attribute values must be
+            finite, since the file format has no way to write others. """
+        for start, end, attributes in self.settings:
+            for name, value in attributes.items():
+                if value is not None and not math.isfinite(value):
+                    raise ValueError("%s of link %s %s is %r; only finite values can be written"
+                                     % (name, start, end, value))
+        with open(path, 'w') as f:
+            # one line per run of links from the same node
+            line = []
+            for start, end in self.links:
+                if line and line[0] != start:
+                    f.write(' '.join(line) + '\n')
+                    line = []
+                if not line:
+                    line.append(start)
+                line.append(end)
+            if line:
+                f.write(' '.join(line) + '\n')
+            f.write('\n')
+            for start, end, attributes in self.settings:
+                fields = ['%r%s' % (attributes[name], unit) for name, unit in written_units
+                          if attributes.get(name) is not None]
+                f.write('%s %s %s\n' % (start, end, ' '.join(fields)))
+
+    def save(self, path, stamp=(0.0, 0)):
+        """ Write the topology in compiled form: node names, then links
+            and settings as arrays of node numbers and of attribute
+            values (NaN where an attribute is not set). stamp identifies
+            the source it was parsed from. The file is written under a
+            temporary name and then renamed, so a reader never sees it
+            half written, even if several processes save it at once. """
+        number = dict((name, i) for i, name in enumerate(self.nodes))
+        links = array.array('i', [number[name] for link in self.links for name in link])
+        ends = array.array('i', [number[name] for start, end, _ in self.settings for name in (start, end)])
+        values = b''.join(values_format.pack(*[attributes.get(name, nan) for name in attribute_names])
+                          for _, _, attributes in self.settings)
+        names = '\n'.join(self.nodes).encode('utf-8')
+        directory, name = os.path.split(path)
+        handle, temporary = tempfile.mkstemp(prefix=name + '.', dir=directory or '.')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(header.pack(magic, stamp[0], stamp[1], len(names), len(self.links), len(self.settings)))
+                f.write(names)
+                links.tofile(f)
+                ends.tofile(f)
+                f.write(values)
+            os.replace(temporary, path)
+        except Exception:
+            os.remove(temporary)
+            raise
+
+    @staticmethod
+    def read(path):
+        """ Read a topology written by save. Returns the topology and
+            the stamp saved with it, or None if the file is not valid. """
+        with open(path, 'rb') as f:
+            data = f.read(header.size)
+            if len(data) < header.size:
+                return None
+            tag, mtime, size, length, nlinks, nsettings = header.unpack(data)
+            if tag != magic:
+                return None
+            topology = Topology()
+            names = f.read(length).decode('utf-8')
+            topology.nodes = names.split('\n') if names else []
+            links = array.array('i')
+            links.fromfile(f, 2 * nlinks)
+            ends = array.array('i')
+            ends.fromfile(f, 2 * nsettings)
+            width = values_format.size
+            values = f.read(width * nsettings)
+            if len(values) < width * nsettings:
+                return None
+        nodes = topology.nodes
+        topology.links = list(zip([nodes[i] for i in links[0::2]], [nodes[i] for i in links[1::2]]))
+        # settings usually repeat a few combinations of values, so only
+        # unpack each distinct one once
+        chunks = [values[i:i + width] for i in range(0, len(values), width)]
+        attributes = {}
+        for chunk in set(chunks):
+            attributes[chunk] = dict((name, value) for name, value in zip(attribute_names, values_format.unpack(chunk))
+                                     if value == value)
+        topology.settings = [(nodes[start], nodes[end], dict(attributes[chunk]))
+                             for start, end, chunk in zip(ends[0::2], ends[1::2], chunks)]
+        return topology, (mtime, size)
+
+
+letters = string.ascii_letters
+
+# unit suffix -> (Link attribute, conversion from the number in front of it)
+units = {
+    'bps': ('bandwidth', lambda value: value),
+    'Kbps': ('bandwidth', lambda value: value * 1000),
+    'Mbps': ('bandwidth', lambda value: value * 1000000),
+    'Gbps': ('bandwidth', lambda value: value * 1000000000),
+    'ms': ('propagation', lambda value: value / 1000.0),
+    'seconds': ('propagation', lambda value: value),
+    'pkts': ('queue_size', lambda value: value),
+    'loss': ('loss', lambda value: value),
+}
+
+# how Topology.write writes each attribute, exactly
+written_units = [('bandwidth', 'bps'), ('propagation', 'seconds'), ('queue_size', 'pkts'), ('loss', 'loss')]
+
+# compiled topologies: magic, source mtime and size, and the length of
+# the node names, the number of links and the number of settings
+magic = b'BENETOP1'
+header = struct.Struct('<8sdqiii')
+attribute_names = ('bandwidth', 'propagation', 'queue_size', 'loss')
+values_format = struct.Struct('<%dd' % len(attribute_names))
+nan = float('nan')
+
+
+# parsed topologies, keyed by file path; reused for as long as the file
+# doesn't change, so repeated runs in one process parse it only once
+cache = {}
+
+
+def compiled_path(path):
+    """ Where the compiled form of a configuration file is kept: like
+        Python bytecode, in a __pycache__ directory next to it. """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, '__pycache__', name + '.topology')
+
+
+def load(config, compile=True):
+    """ Return the parsed topology for a configuration file, or config
+        itself if it already is a Topology. Parsed files are kept in
+        memory and, if compile is set, also saved in compiled form
+        (see Topology.save), which later processes read instead of
+        parsing the file again for as long as it doesn't change. """
+    if isinstance(config, Topology):
+        return config
+    path = os.path.abspath(config)
+    info = os.stat(path)
+    stamp = (info.st_mtime, info.st_size)
+    entry = cache.get(path)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    parsed = None
+    if compile:
+        compiled = compiled_path(path)
+        try:
+            result = Topology.read(compiled)
+        except (IOError, OSError, ValueError, EOFError):
+            result = None
+        if result is not None and result[1] == stamp:
+            parsed = result[0]
+    if parsed is None:
+        parsed = Topology.parse(path)
+        if compile:
+            try:
+                if not os.path.isdir(os.path.dirname(compiled)):
+                    os.makedirs(os.path.dirname(compiled))
+                parsed.save(compiled, stamp)
+            except (IOError, OSError):
+                # e.g. a read-only directory; just don't cache on disk
+                pass
+    cache[path] = (stamp, parsed)
+    return parsed
@@ -1,3 +1,6 @@
+import bisect
+
+
 class SendBuffer(object):
     """ Send buffer for transport protocols """
 
@@ -6,8 +9,17 @@ class SendBuffer(object):
             is the starting sequence number of the buffer. The next
             value is the sequence number for the next data that has
             not yet been sent. The last value is the sequence number
-            for the last data in the buffer."""
-        self.buffer = b''
+            for the last data in the buffer.
+
+            Data is kept as the chunks it was put in, without copying,
+            along with the sequence number each chunk starts at. Chunks
+            before head have been acked; they are dropped from the
+            lists once they make up half of them. get and resend return
+            memoryviews of a chunk when the data fits in one, so only
+            data that spans chunks is copied. """
+        self.chunks = []
+        self.starts = []
+        self.head = 0
         self.base_seq = 0
         self.next_seq = 0
         self.last_seq = 0
@@ -24,9 +36,31 @@ class SendBuffer(object):
 
     def put(self, data):
         """ Put some data into the buffer """
-        self.buffer += data
+        if not data:
+            return
+        if not isinstance(data, bytes):
+            # the caller may change a bytearray later
+            data = bytes(data)
+        self.chunks.append(memoryview(data))
+        self.starts.append(self.last_seq)
         self.last_seq += len(data)
 
+    def data(self, sequence, size):
+        """ Return size bytes starting at sequence. """
+        index = bisect.bisect_right(self.starts, sequence, self.head) - 1
+        chunk = self.chunks[index]
+        offset = sequence - self.starts[index]
+        if offset + size <= len(chunk):
+            return chunk[offset:offset + size]
+        pieces = [chunk[offset:]]
+        size -= len(chunk) - offset
+        while size > 0:
+            index += 1
+            chunk = self.chunks[index]
+            pieces.append(chunk[:size])
+            size -= len(chunk)
+        return b''.join(pieces)
+
     def get(self, size):
         """ Get the next data that has not been sent yet. Return the
             data and the starting sequence number of this data. The
@@ -34,9 +68,8 @@ class SendBuffer(object):
             be less."""
         if self.next_seq + size > self.last_seq:
             size = self.last_seq - self.next_seq
-        start = self.next_seq - self.base_seq
-        data = self.buffer[start:start + size]
         sequence = self.next_seq
+        data = self.data(sequence, size) if size > 0 else b''
         self.next_seq = self.next_seq + size
         return data, sequence
 
@@ -49,8 +82,8 @@ class SendBuffer(object):
         is standard practice for TCP when retransmitting."""
         if self.base_seq + size > self.last_seq:
             size = self.last_seq - self.base_seq
-        data = self.buffer[:size]
         sequence = self.base_seq
+        data = self.data(sequence, size) if size > 0 else b''
         if reset:
             self.next_seq = sequence + size
         return data, sequence
@@ -61,80 +94,101 @@ class SendBuffer(object):
             sequence number that is not yet acked. In other words, the
             ACK is for all data less than but not equal to this
             sequence number."""
-        acked = sequence - self.base_seq
-        self.buffer = self.buffer[acked:]
         self.base_seq = sequence
+        # drop the chunks that have been acked completely
+        chunks = self.chunks
+        starts = self.starts
+        head = self.head
+        while head < len(chunks) and starts[head] + len(chunks[head]) <= sequence:
+            chunks[head] = None
+            head += 1
+        if head > 1024 and 2 * head > len(chunks):
+            del chunks[:head]
+            del starts[:head]
+            head = 0
+        self.head = head
         # adjust next in case we slide past it
         if self.next_seq < self.base_seq:
             self.next_seq = self.base_seq
 
 
-class Chunk(object):
-    """ Chunk of data stored in receive buffer. """
-
-    def __init__(self, data, sequence):
-        self.data = data
-        self.length = len(data)
-        self.sequence = sequence
-
-    def trim(self, sequence, length):
-        """ Check for overlap with a previous chunk and trim this chunk
-            if needed."""
-        # check for overlap
-        if self.sequence < sequence + length:
-            self.data = self.data[sequence + length:]
-            self.length = len(self.data)
-            self.sequence = sequence + length
-
-
 class ReceiveBuffer(object):
     """ Receive buffer for transport protocols """
 
     def __init__(self):
-        """ The buffer holds all the data that has been received,
-            indexed by starting sequence number. Data may come in out
-            of order, so this buffer will order them. Data may also be
-            duplicated, so this buffer will remove any duplicate
-            bytes."""
-        self.buffer = {}
+        """ The buffer holds all the data that has been received but not
+            yet taken by get. Data may come in out of order, so this
+            buffer will order them. Data may also be duplicated, so this
+            buffer will remove any duplicate bytes.
+
+            Data is kept as sorted, disjoint blocks of contiguous
+            sequence numbers: block i covers starts[i] up to ends[i] and
+            its bytes are the list of pieces[i], which are joined only
+            when get returns them. A new segment is located by bisection
+            and merged with the blocks it overlaps or touches. The blocks
+            are the received intervals (see intervals). """
+        self.starts = []
+        self.ends = []
+        self.pieces = []
         # starting sequence number
         self.base_seq = 0
 
     def put(self, data, sequence):
         """ Add data to the receive buffer. Put it in order of
         sequence number and remove any duplicate data."""
-        # ignore old chunk
+        end = sequence + len(data)
+        # ignore old data and empty segments
+        if end <= self.base_seq or not len(data):
+            return
+        data = memoryview(data)
         if sequence < self.base_seq:
+            data = data[self.base_seq - sequence:]
+            sequence = self.base_seq
+        starts = self.starts
+        ends = self.ends
+        pieces = self.pieces
+        # blocks first to last overlap or touch the new data
+        first = bisect.bisect_left(ends, sequence)
+        last = bisect.bisect_right(starts, end, first)
+        if first == last:
+            starts.insert(first, sequence)
+            ends.insert(first, end)
+            pieces.insert(first, [data])
             return
-        # ignore duplicate chunk
-        if sequence in self.buffer:
-            if self.buffer[sequence].length >= len(data):
-                return
-        self.buffer[sequence] = Chunk(data, sequence)
-        # remove overlapping data
-        next_data = -1
-        length = 0
-
-        for sequence in sorted(self.buffer.keys()):
-            chunk = self.buffer[sequence]
-            # trim chunk if there is duplicate data from the previous chunk
-            chunk.trim(next_data, length)
-            if chunk.length == 0:
-                # remove chunk
-                del self.buffer[sequence]
-            next_data = chunk.sequence
-            length = len(chunk.data)
+        if last == first + 1 and starts[first] <= sequence and end <= ends[first]:
+            # duplicate
+            return
+        # fill the gaps between the blocks with the new data and merge
+        # everything into the first block
+        merged = pieces[first]
+        if sequence < starts[first]:
+            merged.insert(0, data[:starts[first] - sequence])
+            starts[first] = sequence
+        for block in range(first + 1, last):
+            merged.append(data[ends[block - 1] - sequence:starts[block] - sequence])
+            merged.extend(pieces[block])
+        if end > ends[last - 1]:
+            merged.append(data[ends[last - 1] - sequence:])
+        ends[first] = max(end, ends[last - 1])
+        del starts[first + 1:last]
+        del ends[first + 1:last]
+        del pieces[first + 1:last]
 
     def get(self):
         """ Get and remove all data that is in order. Return the data
             and its starting sequence number. """
-        data = b''
         start = self.base_seq
-        for sequence in sorted(self.buffer.keys()):
-            chunk = self.buffer[sequence]
-            if chunk.sequence == self.base_seq:
-                # append the data, adjust the base, delete the chunk
-                data += chunk.data
-                self.base_seq += chunk.length
-                del self.buffer[chunk.sequence]
+        if not self.starts or self.starts[0] != start:
+            return b'', start
+        data = b''.join(self.pieces[0])
+        self.base_seq = self.ends[0]
+        del self.starts[0]
+        del self.ends[0]
+        del self.pieces[0]
         return data, start
+
+    def intervals(self):
+        """ Return the ranges of sequence numbers that have been
+            received but not taken by get, as sorted (start, end)
+            pairs, end being exclusive. """
+        return list(zip(self.starts, self.ends))
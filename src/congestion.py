@@ -0,0 +1,149 @@
+""" Congestion control for the TCP sender. An algorithm keeps the
+    congestion window (cwnd) and the slow start threshold (ssthresh),
+    both in bytes, and the sender tells it what happens to its data: new
+    data being acknowledged, entering fast recovery after three duplicate
+    ACKs, further duplicate ACKs and partial ACKs during recovery,
+    leaving recovery and retransmission timeouts. The sender keeps at
+    most cwnd bytes outstanding (and no more than its window). """
+
+
+class Reno(object):
+    """ TCP Reno (RFC 5681): slow start, congestion avoidance, fast
+        retransmit and fast recovery. Recovery ends with the first ACK
+        of new data, so further losses in the same window are usually
+        only repaired by another fast retransmit or a timeout. initial
+        is the initial window in segments. """
+
+    def __init__(self, initial=1):
+        self.initial = initial
+        self.mss = 1000
+        self.cwnd = initial * self.mss
+        self.ssthresh = float('inf')
+        # smoothed round-trip time, if the sender measures it
+        self.rtt = 0
+
+    def attach(self, tcp):
+        self.mss = tcp.mss
+        self.cwnd = self.initial * self.mss
+        self.ssthresh = float('inf')
+
+    def ack(self, acked, now):
+        """ acked bytes of new data were acknowledged outside recovery. """
+        if self.cwnd < self.ssthresh:
+            # slow start
+            self.cwnd += min(acked, self.mss)
+        else:
+            # congestion avoidance: about one segment per round trip
+            self.cwnd += self.mss * self.mss / float(self.cwnd)
+
+    def decrease(self, outstanding, now):
+        """ Set ssthresh after a loss, with outstanding bytes in flight. """
+        self.ssthresh = max(outstanding / 2.0, 2.0 * self.mss)
+
+    def enter_recovery(self, outstanding, now):
+        """ Three duplicate ACKs: the sender retransmits the first
+            unacknowledged segment. """
+        self.decrease(outstanding, now)
+        self.cwnd = self.ssthresh + 3 * self.mss
+
+    def dup_ack(self):
+        """ Another duplicate ACK during recovery; each one means a
+            segment has left the network. """
+        self.cwnd += self.mss
+
+    def partial_ack(self, acked):
+        """ An ACK of new data during recovery that doesn't cover all of
+            the data sent before it started. Return whether to stay in
+            recovery, in which case the sender retransmits the next
+            unacknowledged segment. """
+        return False
+
+    def exit_recovery(self):
+        self.cwnd = self.ssthresh
+
+    def timeout(self, outstanding, now):
+        self.decrease(outstanding, now)
+        self.cwnd = self.mss
+
+
+class NewReno(Reno):
+    """ TCP NewReno (RFC 6582): like Reno, but a partial ACK during fast
+        recovery retransmits the next hole and keeps the sender in
+        recovery until all data outstanding when it started is
+        acknowledged, so several losses in one window cost one recovery. """
+
+    def partial_ack(self, acked):
+        # deflate by the amount acknowledged, then add back one segment
+        self.cwnd -= acked
+        if acked >= self.mss:
+            self.cwnd += self.mss
+        return True
+
+
+class Cubic(NewReno):
+    """ CUBIC (RFC 9438), with NewReno loss recovery. In congestion
+        avoidance the window follows a cubic function of the time since
+        the last loss, centered on the window at that loss (w_max), so it
+        grows quickly back towards w_max, slowly near it and quickly
+        again beyond it. The window never grows slower than Reno's would
+        with the same decrease (the Reno-friendly region). A loss
+        multiplies the window by beta. """
+
+    c = 0.4
+    beta = 0.7
+
+    def __init__(self, initial=1):
+        NewReno.__init__(self, initial)
+        self.w_max = 0
+        self.epoch = None
+
+    def attach(self, tcp):
+        NewReno.attach(self, tcp)
+        self.w_max = 0
+        self.epoch = None
+
+    def ack(self, acked, now):
+        if self.cwnd < self.ssthresh:
+            self.cwnd += min(acked, self.mss)
+            return
+        mss = float(self.mss)
+        if self.epoch is None:
+            # first congestion avoidance step since the last loss
+            self.epoch = now
+            if self.cwnd < self.w_max:
+                self.k = ((self.w_max - self.cwnd) / mss / self.c) ** (1.0 / 3)
+                self.origin = self.w_max
+            else:
+                self.k = 0
+                self.origin = self.cwnd
+            self.estimate = self.cwnd
+        # where the window should be one round trip from now
+        t = now - self.epoch + self.rtt
+        target = self.origin + self.c * (t - self.k) ** 3 * mss
+        target = min(max(target, self.cwnd), 1.5 * self.cwnd)
+        # Reno with the same decrease would grow by alpha segments per
+        # round trip
+        alpha = 3 * (1 - self.beta) / (1 + self.beta)
+        self.estimate += alpha * acked * mss / self.cwnd
+        if self.estimate > target:
+            self.cwnd = self.estimate
+        else:
+            self.cwnd += (target - self.cwnd) * acked / self.cwnd
+
+    def decrease(self, outstanding, now):
+        cwnd = self.cwnd
+        if cwnd < self.w_max:
+            # fast convergence: release bandwidth to newer flows
+            self.w_max = cwnd * (1 + self.beta) / 2
+        else:
+            self.w_max = cwnd
+        self.ssthresh = max(cwnd * self.beta, 2.0 * self.mss)
+        self.epoch = None
+
+
+# congestion control algorithms by name
+algorithms = {
+    'reno': Reno,
+    'newreno': NewReno,
+    'cubic': Cubic,
+}
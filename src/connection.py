@@ -10,6 +10,7 @@ class Connection(object):
         self.destination_address = destination_address
         self.destination_port = destination_port
         self.node = self.transport.node
+        self.sim = self.transport.sim
         self.transport.bind(self, source_address, source_port,
                             destination_address, destination_port)
         # setup application delivery
@@ -0,0 +1,187 @@
+import bisect
+import collections
+import heapq
+import math
+
+
+class HeapQueue(object):
+    """ Pending-event set kept as a binary heap. Entries are
+        [time, key, event, handler] lists. Insert and pop-min are
+        O(log n). """
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, entry):
+        heapq.heappush(self.heap, entry)
+
+    def peek(self):
+        return self.heap[0]
+
+    def pop(self):
+        return heapq.heappop(self.heap)
+
+    def extend(self, entries):
+        """ Add a batch of entries. Large batches are appended and the
+            heap is rebuilt in one O(n) heapify instead of being pushed
+            one at a time. """
+        size = len(self.heap) + len(entries)
+        if len(entries) * math.log(size + 1, 2) > size:
+            self.heap.extend(entries)
+            heapq.heapify(self.heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self.heap, entry)
+
+    def purge(self):
+        """ Remove cancelled entries. """
+        self.heap = [entry for entry in self.heap if entry[3] is not None]
+        heapq.heapify(self.heap)
+
+    def clear(self):
+        self.heap = []
+
+
+class CalendarQueue(object):
+    """ Pending-event set kept as a calendar queue (R. Brown, 1988).
+        Time is divided into buckets of a fixed width that wrap around
+        like the days of a year. Each bucket holds a short sorted list,
+        so insert and pop-min are amortized O(1) as long as the bucket
+        width matches the typical spacing between events. The number of
+        buckets doubles or halves with the queue size and the width is
+        re-estimated from the events at the front of the queue each time
+        it does. Entries are [time, key, event, handler] lists and are
+        popped in exactly the same order as from a HeapQueue. """
+
+    minimum_buckets = 16
+    # buckets that grow past this many events, typically because many
+    # events share a timestamp, are turned into deques so popping from
+    # the front stays cheap
+    deque_size = 256
+    # number of events sampled from the front of the queue to estimate
+    # the bucket width on resize
+    sample_size = 32
+
+    def __init__(self, buckets=None, width=1.0):
+        self.size = 0
+        self.width = width
+        self.buckets = []
+        self.resize(buckets or self.minimum_buckets, width)
+
+    def __len__(self):
+        return self.size
+
+    def resize(self, buckets, width=None):
+        """ Redistribute the queue over the given number of buckets. If
+            no width is given, estimate it from the current events. """
+        entries = self.entries()
+        if width is None:
+            width = self.estimate_width(entries)
+        self.width = width
+        self.nbuckets = buckets
+        self.buckets = [[] for _ in range(buckets)]
+        # absolute number of the bucket that holds the next event;
+        # its position in the bucket array is bucket % nbuckets
+        self.bucket = 0
+        for entry in entries:
+            self.buckets[int(entry[0] / width) % buckets].append(entry)
+        for i, events in enumerate(self.buckets):
+            if len(events) > self.deque_size:
+                self.buckets[i] = collections.deque(sorted(events))
+            elif len(events) > 1:
+                events.sort()
+        if entries:
+            self.bucket = int(min(entries)[0] / width)
+        self.grow = 2 * buckets
+        self.shrink = buckets // 2 if buckets > self.minimum_buckets else -1
+
+    def entries(self):
+        return [entry for events in self.buckets for entry in events]
+
+    def estimate_width(self, entries):
+        """ Use three times the average separation of the events at
+            the front of the queue. """
+        times = [entry[0] for entry in heapq.nsmallest(self.sample_size, entries)]
+        if len(times) < 2 or times[-1] == times[0]:
+            return self.width
+        return 3.0 * (times[-1] - times[0]) / (len(times) - 1)
+
+    def push(self, entry):
+        bucket = int(entry[0] / self.width)
+        events = self.buckets[bucket % self.nbuckets]
+        # new events usually sort after everything already in their
+        # bucket, so only fall back to an insertion sort when they don't
+        if not events or entry > events[-1]:
+            events.append(entry)
+        else:
+            bisect.insort(events, entry)
+        if len(events) == self.deque_size and events.__class__ is list:
+            self.buckets[bucket % self.nbuckets] = collections.deque(events)
+        if bucket < self.bucket:
+            self.bucket = bucket
+        self.size += 1
+        if self.size > self.grow:
+            self.resize(2 * self.nbuckets)
+
+    def front(self):
+        """ Move to the bucket holding the earliest event and return
+            that bucket. """
+        if not self.size:
+            raise IndexError('calendar queue is empty')
+        buckets = self.buckets
+        nbuckets = self.nbuckets
+        width = self.width
+        bucket = self.bucket
+        events = buckets[bucket % nbuckets]
+        if not events or int(events[0][0] / width) > bucket:
+            # scan the rest of the year starting at the current bucket
+            for bucket in range(bucket + 1, bucket + nbuckets):
+                events = buckets[bucket % nbuckets]
+                if events and int(events[0][0] / width) <= bucket:
+                    break
+            else:
+                # every event is more than a year away; jump directly to
+                # the earliest one
+                bucket = int(min(events[0] for events in buckets if events)[0] / width)
+                events = buckets[bucket % nbuckets]
+            self.bucket = bucket
+        return events
+
+    def peek(self):
+        return self.front()[0]
+
+    def pop(self):
+        events = self.front()
+        if events.__class__ is list:
+            entry = events.pop(0)
+        else:
+            entry = events.popleft()
+        self.size -= 1
+        if self.size < self.shrink:
+            self.resize(self.nbuckets // 2)
+        return entry
+
+    def extend(self, entries):
+        """ Add a batch of entries. """
+        for entry in entries:
+            self.push(entry)
+
+    def purge(self):
+        """ Remove cancelled entries. """
+        for i, events in enumerate(self.buckets):
+            self.buckets[i] = events.__class__(entry for entry in events if entry[3] is not None)
+        self.size = sum(len(events) for events in self.buckets)
+
+    def clear(self):
+        self.size = 0
+        self.buckets = []
+        self.resize(self.minimum_buckets, self.width)
+
+
+backends = {
+    'heap': HeapQueue,
+    'calendar': CalendarQueue,
+}
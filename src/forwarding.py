@@ -0,0 +1,178 @@
+class ForwardingTable(object):
+    """ Forwarding table with longest-prefix match over 32-bit
+        addresses. A route maps a prefix, given as the address bits
+        above the host part (address >> (32 - length)) and its length,
+        to a link; a route for a single address has length 32. Routes
+        are kept in one dictionary per prefix length and a lookup tries
+        the lengths in use from longest to shortest, so both memory and
+        lookup time depend on the number of routes, not on the number
+        of addresses they cover.
+
+        aggregate() merges every two routes of the same length that
+        differ only in their last bit and use the same link into one
+        route that is a bit shorter, repeatedly, and keeps doing so for
+        routes added later. A merged route still matches with the
+        priority of the routes it replaced, so it behaves exactly like
+        them: it is kept apart from routes of its own length, and
+        removing or changing one of the routes it replaced splits it
+        again. Recent lookups are cached until the table changes; the
+        cache is cleared when it fills up, so its size doesn't grow
+        with the number of destinations. """
+
+    cache_size = 4096
+
+    def __init__(self):
+        # (length, priority) -> {prefix: link}, where priority is the
+        # length of the routes a merged route replaced and the length
+        # itself for other routes
+        self.routes = {}
+        # keys of routes in lookup order, highest priority first
+        self.order = []
+        # address -> link, for at most cache_size addresses
+        self.cache = {}
+        # whether routes are merged
+        self.aggregated = False
+
+    def __len__(self):
+        return sum(len(routes) for routes in self.routes.values())
+
+    def items(self):
+        """ Return the routes as ((prefix, length), link) pairs, with
+            merged routes under their actual prefix. """
+        return [((prefix, key[0]), link) for key in self.order
+                for prefix, link in self.routes[key].items()]
+
+    def lookup(self, address):
+        """ Return the link of the longest prefix matching address, or
+            None if no route matches. """
+        link = self.cache.get(address)
+        if link is not None:
+            return link
+        routes = self.routes
+        for key in self.order:
+            link = routes[key].get(address >> (32 - key[0]))
+            if link is not None:
+                if len(self.cache) >= self.cache_size:
+                    self.cache.clear()
+                self.cache[address] = link
+                return link
+        return None
+
+    def get(self, prefix, length=32):
+        """ Return the link for exactly this prefix, or None if it has no
+            route of its own. """
+        routes = self.routes.get((length, length))
+        if routes is not None and prefix in routes:
+            return routes[prefix]
+        if not self.aggregated:
+            return None
+        covering = self.covering(prefix, length)
+        if covering is None:
+            return None
+        return self.routes[(covering[1], length)][covering[0]]
+
+    def covering(self, prefix, length):
+        """ Return the merged route that replaced the route for a
+            prefix, as (prefix, length), or None. """
+        for shorter, priority in self.order:
+            if priority == length and shorter < length:
+                route = prefix >> (length - shorter)
+                if route in self.routes[(shorter, priority)]:
+                    return route, shorter
+        return None
+
+    def set(self, prefix, length, priority, link):
+        key = (length, priority)
+        routes = self.routes.get(key)
+        if routes is None:
+            routes = self.routes[key] = {}
+            self.order.append(key)
+            self.order.sort(key=lambda key: (key[1], key[0]), reverse=True)
+        routes[prefix] = link
+
+    def unset(self, prefix, length, priority):
+        key = (length, priority)
+        routes = self.routes[key]
+        del routes[prefix]
+        if not routes:
+            del self.routes[key]
+            self.order.remove(key)
+
+    def split(self, prefix, length):
+        """ Undo the merge covering prefix, giving every part of the
+            merged route except the prefix back a route of its own. """
+        covering = self.covering(prefix, length)
+        if covering is None:
+            return None
+        route, shorter = covering
+        link = self.routes[(shorter, length)][route]
+        self.unset(route, shorter, length)
+        for level in range(shorter + 1, length + 1):
+            self.set((prefix >> (length - level)) ^ 1, level, length, link)
+        return link
+
+    def add(self, prefix, length, link):
+        """ Route a prefix (an address if length is 32) over link. """
+        self.cache.clear()
+        if not self.aggregated:
+            self.set(prefix, length, length, link)
+            return
+        self.split(prefix, length)
+        self.set(prefix, length, length, link)
+        # merge with the other half of the next shorter prefix
+        level = length
+        while level > 0:
+            routes = self.routes[(level, length)]
+            if routes.get(prefix ^ 1) is not link:
+                return
+            self.unset(prefix, level, length)
+            self.unset(prefix ^ 1, level, length)
+            prefix >>= 1
+            level -= 1
+            self.set(prefix, level, length, link)
+
+    def extend(self, routes, length=32):
+        """ Add a route for every prefix in routes, a dictionary of
+            prefixes of the same length and their links. The table may
+            keep the dictionary. """
+        if self.aggregated:
+            for prefix, link in routes.items():
+                self.add(prefix, length, link)
+            return
+        self.cache.clear()
+        key = (length, length)
+        if key in self.routes:
+            self.routes[key].update(routes)
+        elif routes:
+            self.routes[key] = routes
+            self.order.append(key)
+            self.order.sort(key=lambda key: (key[1], key[0]), reverse=True)
+
+    def remove(self, prefix, length=32, link=None):
+        """ Remove the route for a prefix, if it uses link (or any link
+            if link is None). """
+        through = self.get(prefix, length)
+        if through is None or (link is not None and through is not link):
+            return
+        self.cache.clear()
+        routes = self.routes.get((length, length))
+        if routes is not None and prefix in routes:
+            self.unset(prefix, length, length)
+        else:
+            self.split(prefix, length)
+
+    def aggregate(self):
+        """ Merge routes as far as possible, now and from now on. """
+        self.aggregated = True
+        self.cache.clear()
+        for priority in sorted(set(key[1] for key in self.routes)):
+            for level in range(priority, 0, -1):
+                routes = self.routes.get((level, priority))
+                if routes is None:
+                    continue
+                pairs = [(prefix, link) for prefix, link in routes.items()
+                         if not prefix & 1 and routes.get(prefix | 1) is link]
+                for prefix, link in pairs:
+                    self.unset(prefix, level, priority)
+                    self.unset(prefix | 1, level, priority)
+                    self.set(prefix >> 1, level - 1, priority, link)
@@ -1,68 +1,209 @@
-import random
+import collections
 
+from . import tracelog
+from .loss import Bernoulli
+from .queues import DropTail
 from .sim import Sim
 
+# how drop reasons read in traces
+drop_reasons = {
+    tracelog.OVERFLOW: 'queue overflow',
+    tracelog.LOSS: 'random loss',
+    tracelog.LINK_DOWN: 'link down',
+    tracelog.EARLY: 'early drop',
+}
+
 
 class Link(object):
     def __init__(self, address=0, startpoint=None, endpoint=None, queue_size=None,
-                 bandwidth=1000000.0, propagation=0.001, loss=0):
+                 bandwidth=1000000.0, propagation=0.001, loss=0, sim=None, queue=None,
+                 analytic=False):
+        """ queue is the queue discipline (see queues); the default is
+            a DropTail queue holding up to queue_size packets.
+
+            In analytic mode, the link computes when each packet will
+            start transmitting from the time the link becomes free and
+            schedules only its arrival at the endpoint, instead of also
+            scheduling an event at the end of every transmission. Delays
+            and overflow drops are the same as in the normal mode, but
+            the TRANSMIT log record is written when the packet is
+            queued. It needs a DropTail queue.
+
+            In both modes, a packet that arrives at the instant a
+            transmission ends finds the next queued packet already
+            transmitting, whatever order the scheduler would run the
+            arrival and the end of the transmission in.
+
+            loss is the probability that a packet is lost; set_loss_model
+            installs other loss models (see loss). """
+        self.sim = sim if sim is not None else Sim.default
         self.running = True
         self.address = address
         self.startpoint = startpoint
         self.endpoint = endpoint
-        self.queue_size = queue_size
         self.bandwidth = bandwidth
         self.propagation = propagation
+        self.loss_model = None
         self.loss = loss
         self.busy = False
-        self.queue = []
+        # event at the end of the current transmission
+        self.finishing = None
+        # functions called with the link when it goes down or up
+        self.watchers = []
+        # analytic mode: when the link finishes its last queued packet,
+        # and the start times of the packets still waiting
+        self.busy_until = 0
+        self.starts = collections.deque()
+        self.analytic = False
+        self.set_queue(queue if queue is not None else DropTail(queue_size))
+        self.analytic = analytic
+
+    def trace(self, message, *args):
+        self.sim.trace("Link", message, *args)
+
+    def set_queue(self, queue):
+        """ Replace the queue discipline. Call this while the queue is
+            empty; packets in the old queue are discarded. """
+        if self.analytic and queue.__class__ is not DropTail:
+            raise ValueError("analytic links need a DropTail queue, not %s" % queue.__class__.__name__)
+        queue.attach(self)
+        self.queue = queue
+
+    @property
+    def analytic(self):
+        return self.is_analytic
+
+    @analytic.setter
+    def analytic(self, analytic):
+        """ Switch modes while the link is idle. """
+        if analytic and self.queue.__class__ is not DropTail:
+            raise ValueError("analytic links need a DropTail queue, not %s" % self.queue.__class__.__name__)
+        self.is_analytic = analytic
+
+    @property
+    def loss(self):
+        return getattr(self.loss_model, 'rate', 0)
+
+    @loss.setter
+    def loss(self, rate):
+        self.set_loss_model(Bernoulli(rate) if rate > 0 else None)
+
+    def set_loss_model(self, model):
+        if model is not None:
+            model.attach(self)
+        self.loss_model = model
 
-    @staticmethod
-    def trace(message):
-        Sim.trace("Link", message)
+    def stream(self):
+        """ Return this link's own random number generator. It is
+            identified by the link's address and the hostnames of its
+            ends, so it is the same in every run with the same seed,
+            including in every partition of a parallel simulation. """
+        return self.sim.stream(('link', self.address, getattr(self.startpoint, 'hostname', None),
+                                getattr(self.endpoint, 'hostname', None)))
+
+    @property
+    def queue_size(self):
+        return self.queue.limit
+
+    @queue_size.setter
+    def queue_size(self, limit):
+        self.queue.limit = limit
 
     # -- Handling packets --
 
     def send_packet(self, packet):
         # check if link is running
         if not self.running:
+            self.drop(packet, tracelog.LINK_DOWN)
+            return
+        now = self.sim.scheduler.current_time()
+        if self.is_analytic:
+            self.send_analytic(packet, now)
             return
-        # drop packet due to queue overflow
-        if self.queue_size and len(self.queue) == self.queue_size:
-            self.trace("%d dropped packet due to queue overflow" % self.address)
+        if self.busy and self.finishing[0] <= now and self.finishing[3] is not None:
+            # the transmission ends now; end it before queueing the packet
+            self.sim.scheduler.cancel(self.finishing)
+            self.get_next_packet('finish')
+        # let the queue discipline drop the packet, e.g. due to overflow
+        reason = self.queue.admit(packet, now)
+        if reason is not None:
+            self.drop(packet, reason)
             return
         # drop packet due to random loss
-        if self.loss > 0 and random.random() < self.loss:
-            self.trace("%d dropped packet due to random loss" % self.address)
+        if self.loss_model is not None and self.loss_model.lost():
+            self.drop(packet, tracelog.LOSS)
             return
-        packet.enter_queue = Sim.scheduler.current_time()
-        if len(self.queue) == 0 and not self.busy:
+        if self.sim.log is not None:
+            self.sim.log.packet(tracelog.ENQUEUE, self.address, packet)
+        packet.enter_queue = now
+        if not self.busy:
             # packet can be sent immediately
             self.busy = True
             self.transmit(packet)
         else:
             # add packet to queue
-            self.queue.append(packet)
+            self.queue.enqueue(packet, now)
+
+    def send_analytic(self, packet, now):
+        # packets that have started transmitting have left the queue
+        starts = self.starts
+        while starts and starts[0] <= now:
+            starts.popleft()
+        limit = self.queue.limit
+        if limit and len(starts) >= limit:
+            self.drop(packet, tracelog.OVERFLOW)
+            return
+        if self.loss_model is not None and self.loss_model.lost():
+            self.drop(packet, tracelog.LOSS)
+            return
+        if self.sim.log is not None:
+            self.sim.log.packet(tracelog.ENQUEUE, self.address, packet)
+            self.sim.log.packet(tracelog.TRANSMIT, self.address, packet)
+        packet.enter_queue = now
+        if self.busy_until > now:
+            start = self.busy_until
+            starts.append(start)
+        else:
+            start = now
+        delay = (8.0 * packet.length) / self.bandwidth
+        packet.queueing_delay += start - now
+        packet.transmission_delay += delay
+        packet.propagation_delay += self.propagation
+        self.busy_until = start + delay
+        self.sim.scheduler.add_at(start + (delay + self.propagation), packet, self.endpoint.receive_packet)
+
+    def drop(self, packet, reason):
+        if __debug__ and "Link" in self.sim.debug:
+            self.trace("%d dropped packet due to %s", self.address, drop_reasons.get(reason, reason))
+        if self.sim.log is not None:
+            self.sim.log.packet(tracelog.DROP, self.address, packet, reason)
+        self.sim.release(packet)
 
     def transmit(self, packet):
-        packet.queueing_delay += Sim.scheduler.current_time() - packet.enter_queue
+        packet.queueing_delay += self.sim.scheduler.current_time() - packet.enter_queue
         delay = (8.0 * packet.length) / self.bandwidth
         packet.transmission_delay += delay
         packet.propagation_delay += self.propagation
+        if self.sim.log is not None:
+            self.sim.log.packet(tracelog.TRANSMIT, self.address, packet)
         # schedule packet arrival at end of link
-        Sim.scheduler.add(delay=delay + self.propagation, event=packet, handler=self.endpoint.receive_packet)
+        self.sim.scheduler.add(delay=delay + self.propagation, event=packet, handler=self.endpoint.receive_packet)
         # schedule next transmission
-        Sim.scheduler.add(delay=delay, event='finish', handler=self.get_next_packet)
+        self.finishing = self.sim.scheduler.add(delay=delay, event='finish', handler=self.get_next_packet)
 
     def get_next_packet(self, event):
-        if len(self.queue) > 0:
-            packet = self.queue.pop(0)
+        packet = self.queue.dequeue(self.sim.scheduler.current_time())
+        if packet is not None:
             self.transmit(packet)
         else:
             self.busy = False
 
     def down(self, event):
         self.running = False
+        for watcher in self.watchers:
+            watcher(self)
 
     def up(self, event):
         self.running = True
+        for watcher in self.watchers:
+            watcher(self)
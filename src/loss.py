@@ -0,0 +1,156 @@
+""" Packet loss models for links. A model decides for each packet a link
+    accepts whether it is lost. Models draw their random numbers from
+    the link's own stream (Link.stream), in batches, so a link's losses
+    only depend on the simulation's seed and the packets sent on that
+    link, not on what else happens in the simulation. Batches are drawn
+    with NumPy when it is installed and with the random module
+    otherwise; the two give different (equally valid) sequences. """
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LossModel(object):
+    """ Base class: subclasses fill self.decisions with a list of
+        booleans, one per packet, in refill. """
+
+    # number of packets decided at a time
+    batch = 4096
+
+    def __init__(self):
+        self.link = None
+        self.random = None
+        self.generator = None
+        self.decisions = []
+        self.index = 0
+
+    def attach(self, link):
+        self.link = link
+        self.random = None
+        self.decisions = []
+        self.index = 0
+
+    def lost(self):
+        """ Return whether the next packet is lost. """
+        index = self.index
+        if index == len(self.decisions):
+            if self.random is None:
+                self.random = self.link.stream()
+                if numpy is not None:
+                    self.generator = numpy.random.default_rng(self.random.getrandbits(64))
+            self.decisions = self.refill()
+            index = 0
+        self.index = index + 1
+        return self.decisions[index]
+
+    def uniform(self, count):
+        """ Return count uniform random numbers in [0, 1). """
+        if self.generator is not None:
+            return self.generator.random(count)
+        return [self.random.random() for _ in range(count)]
+
+
+class Bernoulli(LossModel):
+    """ Every packet is lost independently with probability rate. """
+
+    def __init__(self, rate):
+        LossModel.__init__(self)
+        self.rate = rate
+
+    def refill(self):
+        draws = self.uniform(self.batch)
+        if self.generator is not None:
+            return (draws < self.rate).tolist()
+        return [draw < self.rate for draw in draws]
+
+
+class GilbertElliott(LossModel):
+    """ Bursty loss (Gilbert-Elliott model). The link is in a good or a
+        bad state; after each packet it moves from good to bad with
+        probability p and from bad to good with probability r, and a
+        packet is lost with probability good_loss in the good state and
+        bad_loss in the bad state. The mean burst length in the bad
+        state is 1 / r. """
+
+    def __init__(self, p, r, good_loss=0.0, bad_loss=1.0, bad=False):
+        LossModel.__init__(self)
+        self.p = p
+        self.r = r
+        self.good_loss = good_loss
+        self.bad_loss = bad_loss
+        # state of the next packet
+        self.bad = bad
+
+    def refill(self):
+        if self.generator is not None:
+            return self.refill_numpy()
+        states = []
+        bad = self.bad
+        for draw in self.uniform(self.batch):
+            states.append(bad)
+            bad = draw >= self.r if bad else draw < self.p
+        self.bad = bad
+        draws = self.uniform(self.batch)
+        return [draw < (self.bad_loss if bad else self.good_loss) for draw, bad in zip(draws, states)]
+
+    def refill_numpy(self):
+        # the states form runs of geometric length; draw run lengths
+        # until they cover the batch. Runs are memoryless, so the run
+        # cut off at the end of the batch can simply start over.
+        generator = self.generator
+        lengths = []
+        flags = []
+        total = 0
+        bad = self.bad
+        while total < self.batch:
+            probability = self.r if bad else self.p
+            if probability <= 0:
+                length = self.batch - total
+            else:
+                length = int(generator.geometric(probability))
+            lengths.append(length)
+            flags.append(bad)
+            total += length
+            bad = not bad
+        states = numpy.repeat(numpy.array(flags), lengths)[:self.batch]
+        self.bad = bool(flags[-1]) if total > self.batch else bad
+        thresholds = numpy.where(states, self.bad_loss, self.good_loss)
+        return (generator.random(self.batch) < thresholds).tolist()
+
+
+class Trace(LossModel):
+    """ Losses taken from a recorded trace: decisions is a sequence with
+        a true value for every packet that is lost. The trace is
+        replayed from the start when it runs out if repeat is set, and
+        no more packets are lost otherwise. """
+
+    def __init__(self, decisions, repeat=True):
+        LossModel.__init__(self)
+        self.trace = [bool(decision) for decision in decisions]
+        self.repeat = repeat
+        self.replayed = False
+
+    def attach(self, link):
+        LossModel.attach(self, link)
+        self.replayed = False
+
+    def lost(self):
+        index = self.index
+        if index == len(self.decisions):
+            if self.replayed and not self.repeat:
+                return False
+            self.decisions = self.trace
+            self.replayed = True
+            index = 0
+            if not self.decisions:
+                return False
+        self.index = index + 1
+        return self.decisions[index]
+
+    @staticmethod
+    def load(path, repeat=True):
+        """ Read a trace of whitespace-separated 0s and 1s. """
+        with open(path) as f:
+            return Trace([int(field) for line in f for field in line.split()], repeat)
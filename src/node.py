@@ -1,40 +1,58 @@
-import copy
-
+from . import tracelog
+from .forwarding import ForwardingTable
 from .sim import Sim
 
 
 class Node(object):
-    def __init__(self, hostname):
+    def __init__(self, hostname, sim=None):
+        self.sim = sim if sim is not None else Sim.default
         self.hostname = hostname
         self.links = []
+        # indexes over links, kept up to date by add_link and
+        # delete_link: the addresses of this node's interfaces and the
+        # first link to each neighbor by hostname
+        self.addresses = set()
+        self.neighbors = {}
         self.protocols = {}
-        self.forwarding_table = {}
+        self.forwarding_table = ForwardingTable()
+        # (prefix, length) shared by all of this node's addresses, if
+        # the network assigns addresses hierarchically
+        self.prefix = None
+        # computes missing forwarding entries, if set (see
+        # networks.routing.Router)
+        self.router = None
 
-    @staticmethod
-    def trace(message):
-        Sim.trace("Node", message)
+    def trace(self, message, *args):
+        self.sim.trace("Node", message, *args)
 
     # -- Links --
 
     def add_link(self, link):
         self.links.append(link)
+        self.addresses.add(link.address)
+        self.neighbors.setdefault(link.endpoint.hostname, link)
 
     def delete_link(self, link):
         if link not in self.links:
             return
         self.links.remove(link)
+        self.addresses = set(l.address for l in self.links)
+        hostname = link.endpoint.hostname
+        if self.neighbors.get(hostname) is link:
+            del self.neighbors[hostname]
+            for l in self.links:
+                if l.endpoint.hostname == hostname:
+                    self.neighbors[hostname] = l
+                    break
 
     def get_link(self, name):
-        for link in self.links:
-            if link.endpoint.hostname == name:
-                return link
-        return None
+        return self.neighbors.get(name)
 
     def get_address(self, name):
-        for link in self.links:
-            if link.endpoint.hostname == name:
-                return link.address
-        return 0
+        link = self.neighbors.get(name)
+        if link is None:
+            return 0
+        return link.address
 
     # -- Protocols --
 
@@ -48,13 +66,14 @@ class Node(object):
 
     # -- Forwarding table --
 
-    def add_forwarding_entry(self, address, link):
-        self.forwarding_table[address] = link
+    def add_forwarding_entry(self, address, link, length=32):
+        """ Forward packets for address over link. With a length
+            below 32, the entry covers every address that shares its
+            first length bits with address. """
+        self.forwarding_table.add(address >> (32 - length), length, link)
 
-    def delete_forwarding_entry(self, address):
-        if address not in self.forwarding_table:
-            return
-        del self.forwarding_table[address]
+    def delete_forwarding_entry(self, address, length=32):
+        self.forwarding_table.remove(address >> (32 - length), length)
 
     # -- Handling packets --
 
@@ -62,7 +81,7 @@ class Node(object):
         # if this is the first time we have seen this packet, set its
         # creation timestamp
         if packet.created is None:
-            packet.created = Sim.scheduler.current_time()
+            packet.created = self.sim.scheduler.current_time()
 
         # forward the packet
         self.forward_packet(packet)
@@ -70,20 +89,28 @@ class Node(object):
     def receive_packet(self, packet):
         # handle broadcast packets
         if packet.destination_address == 0:
-            self.trace("%s received packet" % self.hostname)
+            if __debug__ and "Node" in self.sim.debug:
+                self.trace("%s received packet", self.hostname)
+            if self.sim.log is not None:
+                self.sim.log.packet(tracelog.RECEIVE, self.sim.log.node(self.hostname), packet)
             self.deliver_packet(packet)
-        else:
-            # check if unicast packet is for me
-            for link in self.links:
-                if link.address == packet.destination_address:
-                    self.trace("%s received packet" % self.hostname)
-                    self.deliver_packet(packet)
-                    return
+        elif packet.destination_address in self.addresses:
+            # unicast packet is for me
+            if __debug__ and "Node" in self.sim.debug:
+                self.trace("%s received packet", self.hostname)
+            if self.sim.log is not None:
+                self.sim.log.packet(tracelog.RECEIVE, self.sim.log.node(self.hostname), packet)
+            self.deliver_packet(packet)
+            return
 
         # decrement the TTL and drop if it has reached the last hop
         packet.ttl -= 1
         if packet.ttl <= 0:
-            self.trace("%s dropping packet due to TTL expired" % self.hostname)
+            if __debug__ and "Node" in self.sim.debug:
+                self.trace("%s dropping packet due to TTL expired", self.hostname)
+            if self.sim.log is not None:
+                self.sim.log.packet(tracelog.DROP, self.sim.log.node(self.hostname), packet, tracelog.TTL)
+            self.sim.release(packet)
             return
 
         # forward the packet
@@ -103,15 +130,25 @@ class Node(object):
             self.forward_unicast_packet(packet)
 
     def forward_unicast_packet(self, packet):
-        if packet.destination_address not in self.forwarding_table:
-            self.trace("%s no routing entry for %d" % (self.hostname, packet.destination_address))
+        link = self.forwarding_table.lookup(packet.destination_address)
+        if link is None and self.router is not None:
+            link = self.router.resolve(self, packet.destination_address)
+        if link is None:
+            if __debug__ and "Node" in self.sim.debug:
+                self.trace("%s no routing entry for %d", self.hostname, packet.destination_address)
+            if self.sim.log is not None:
+                self.sim.log.packet(tracelog.DROP, self.sim.log.node(self.hostname), packet, tracelog.NO_ROUTE)
+            self.sim.release(packet)
             return
-        link = self.forwarding_table[packet.destination_address]
-        self.trace("%s forwarding packet to %d" % (self.hostname, packet.destination_address))
+        if __debug__ and "Node" in self.sim.debug:
+            self.trace("%s forwarding packet to %d", self.hostname, packet.destination_address)
+        if self.sim.log is not None:
+            self.sim.log.packet(tracelog.FORWARD, self.sim.log.node(self.hostname), packet,
+                                packet.destination_address)
         link.send_packet(packet)
 
     def forward_broadcast_packet(self, packet):
         for link in self.links:
-            self.trace("%s forwarding broadcast packet to %s" % (self.hostname, link.endpoint.hostname))
-            packet_copy = copy.deepcopy(packet)
-            link.send_packet(packet_copy)
+            if __debug__ and "Node" in self.sim.debug:
+                self.trace("%s forwarding broadcast packet to %s", self.hostname, link.endpoint.hostname)
+            link.send_packet(packet.clone())
@@ -0,0 +1,50 @@
+class Profiler(object):
+    """ Statistics collected by Scheduler.run(profile=...): the number of
+        events dispatched and the wall time spent in each handler, keyed
+        by the handler's qualified name (for example
+        'Link.get_next_packet'), the largest number of pending events and
+        the overall event rate. One profiler can be passed to several
+        runs to accumulate over all of them. """
+
+    def __init__(self):
+        self.counts = {}
+        self.times = {}
+        self.events = 0
+        self.wall = 0.0
+        self.max_depth = 0
+
+    def add(self, name, elapsed):
+        if name in self.counts:
+            self.counts[name] += 1
+            self.times[name] += elapsed
+        else:
+            self.counts[name] = 1
+            self.times[name] = elapsed
+
+    def events_per_second(self):
+        if self.wall == 0:
+            return 0.0
+        return self.events / self.wall
+
+    def as_dict(self):
+        handlers = {}
+        for name, count in self.counts.items():
+            handlers[name] = {'events': count,
+                              'time': self.times[name],
+                              'mean': self.times[name] / count}
+        return {'events': self.events,
+                'wall': self.wall,
+                'events_per_second': self.events_per_second(),
+                'max_queue_depth': self.max_depth,
+                'handlers': handlers}
+
+    def report(self):
+        lines = ["%d events in %.3f s (%.0f events/s), at most %d pending" % (
+            self.events, self.wall, self.events_per_second(), self.max_depth)]
+        lines.append("%-40s %10s %10s %10s %7s" % ('handler', 'events', 'time (s)', 'mean (us)', 'time %'))
+        for name in sorted(self.times, key=self.times.get, reverse=True):
+            count = self.counts[name]
+            elapsed = self.times[name]
+            share = 100.0 * elapsed / self.wall if self.wall else 0.0
+            lines.append("%-40s %10d %10.3f %10.2f %7.1f" % (name, count, elapsed, 1e6 * elapsed / count, share))
+        return '\n'.join(lines)
@@ -0,0 +1,237 @@
+import collections
+import math
+
+from . import tracelog
+
+
+class Discipline(object):
+    """ Base class for the queue of a link. A link asks its queue
+        whether to admit each arriving packet, queues it with enqueue
+        if the link is busy and takes the next packet to send with
+        dequeue. Packets the discipline decides to drop after admitting
+        them are passed to link.drop. limit is the largest number of
+        queued packets, or None or 0 for no limit. """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.link = None
+
+    def attach(self, link):
+        self.link = link
+
+    def admit(self, packet, now):
+        """ Return None if the packet may be queued, or the reason for
+            dropping it (one of the drop reasons in tracelog). """
+        if self.limit and len(self) >= self.limit:
+            return tracelog.OVERFLOW
+        return None
+
+    def drop(self, packet, reason):
+        if self.link is not None:
+            self.link.drop(packet, reason)
+
+
+class DropTail(Discipline):
+    """ First in, first out; arrivals are dropped while the queue is
+        full. """
+
+    def __init__(self, limit=None):
+        Discipline.__init__(self, limit)
+        self.packets = collections.deque()
+
+    def __len__(self):
+        return len(self.packets)
+
+    def enqueue(self, packet, now):
+        self.packets.append(packet)
+
+    def dequeue(self, now):
+        if self.packets:
+            return self.packets.popleft()
+        return None
+
+
+class RED(DropTail):
+    """ Random Early Detection (Floyd and Jacobson, 1993). Keeps an
+        exponentially weighted average of the queue length and drops
+        arrivals with a probability that rises from 0 to max_probability
+        as the average goes from min_threshold to max_threshold, and
+        all arrivals above that. Drops are spread out by counting the
+        packets admitted since the last one. If packet_time, the time to
+        send a typical packet, is given, the average also decays while
+        the queue is empty. Random numbers come from the simulation of
+        the link unless random is given. """
+
+    def __init__(self, limit=None, min_threshold=5, max_threshold=15,
+                 max_probability=0.1, weight=0.002, packet_time=None, random=None):
+        DropTail.__init__(self, limit)
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.max_probability = max_probability
+        self.weight = weight
+        self.packet_time = packet_time
+        self.random = random
+        self.average = 0.0
+        self.count = -1
+        self.idle_since = 0
+
+    def attach(self, link):
+        DropTail.attach(self, link)
+        if self.random is None:
+            self.random = link.sim.random
+
+    def admit(self, packet, now):
+        length = len(self.packets)
+        if length == 0 and self.packet_time:
+            idle = (now - self.idle_since) / self.packet_time
+            self.average *= (1 - self.weight) ** idle
+        else:
+            self.average += self.weight * (length - self.average)
+        if self.limit and length >= self.limit:
+            self.count = 0
+            return tracelog.OVERFLOW
+        if self.average < self.min_threshold:
+            self.count = -1
+            return None
+        if self.average >= self.max_threshold:
+            self.count = 0
+            return tracelog.EARLY
+        self.count += 1
+        probability = self.max_probability * (self.average - self.min_threshold) / (
+            self.max_threshold - self.min_threshold)
+        if self.count * probability < 1:
+            probability /= 1 - self.count * probability
+        else:
+            probability = 1
+        if self.random.random() < probability:
+            self.count = 0
+            return tracelog.EARLY
+        return None
+
+    def dequeue(self, now):
+        packet = DropTail.dequeue(self, now)
+        if not self.packets:
+            self.idle_since = now
+        return packet
+
+
+class CoDel(Discipline):
+    """ Controlled Delay (Nichols and Jacobson, RFC 8289). Packets are
+        timestamped on arrival; once every packet has waited longer than
+        target for at least interval, CoDel drops packets at the head
+        of the queue, at intervals that shrink with the square root of
+        the number of drops, until the delay falls below target again.
+        maxpacket is the size in bytes of a full packet; the queue never
+        drops while it holds no more than that. """
+
+    def __init__(self, limit=None, target=0.005, interval=0.1, maxpacket=1500):
+        Discipline.__init__(self, limit)
+        self.target = target
+        self.interval = interval
+        self.maxpacket = maxpacket
+        self.packets = collections.deque()
+        self.bytes = 0
+        self.first_above = None
+        self.dropping = False
+        self.drop_next = 0
+        self.count = 0
+        self.last_count = 0
+
+    def __len__(self):
+        return len(self.packets)
+
+    def enqueue(self, packet, now):
+        self.packets.append((now, packet))
+        self.bytes += packet.length
+
+    def control_law(self, time):
+        return time + self.interval / math.sqrt(self.count)
+
+    def next_packet(self, now):
+        """ Return the head packet and whether the delay has been above
+            target for long enough to drop it. """
+        if not self.packets:
+            self.first_above = None
+            return None, False
+        arrival, packet = self.packets.popleft()
+        self.bytes -= packet.length
+        if now - arrival < self.target or self.bytes <= self.maxpacket:
+            self.first_above = None
+            return packet, False
+        if self.first_above is None:
+            self.first_above = now + self.interval
+            return packet, False
+        return packet, now >= self.first_above
+
+    def dequeue(self, now):
+        packet, drop = self.next_packet(now)
+        if packet is None:
+            self.dropping = False
+            return None
+        if self.dropping:
+            if not drop:
+                self.dropping = False
+            while self.dropping and now >= self.drop_next:
+                self.drop(packet, tracelog.EARLY)
+                self.count += 1
+                packet, drop = self.next_packet(now)
+                if not drop:
+                    self.dropping = False
+                else:
+                    self.drop_next = self.control_law(self.drop_next)
+        elif drop:
+            self.drop(packet, tracelog.EARLY)
+            packet, drop = self.next_packet(now)
+            self.dropping = True
+            delta = self.count - self.last_count
+            if delta > 1 and now - self.drop_next < 16 * self.interval:
+                self.count = delta
+            else:
+                self.count = 1
+            self.drop_next = self.control_law(now)
+            self.last_count = self.count
+        return packet
+
+
+class Priority(Discipline):
+    """ Strict priority between bands. classify maps a packet to a band
+        number, 0 being the highest priority; by default it uses the
+        packet's priority field (see Packet). A packet is only sent
+        while all higher bands are empty. Each band is a DropTail queue
+        with the given limit. """
+
+    def __init__(self, limit=None, bands=3, classify=None):
+        self.bands = [DropTail(limit) for _ in range(bands)]
+        self.classify = classify or (lambda packet: getattr(packet, 'priority', 0))
+        Discipline.__init__(self, limit)
+        self.size = 0
+
+    @property
+    def limit(self):
+        return self.bands[0].limit
+
+    @limit.setter
+    def limit(self, limit):
+        for band in self.bands:
+            band.limit = limit
+
+    def __len__(self):
+        return self.size
+
+    def band(self, packet):
+        return self.bands[min(self.classify(packet), len(self.bands) - 1)]
+
+    def admit(self, packet, now):
+        return self.band(packet).admit(packet, now)
+
+    def enqueue(self, packet, now):
+        self.band(packet).enqueue(packet, now)
+        self.size += 1
+
+    def dequeue(self, now):
+        if not self.size:
+            return None
+        for band in self.bands:
+            if band.packets:
+                self.size -= 1
+                return band.packets.popleft()
@@ -1,15 +1,47 @@
 import itertools
-import sched
+import time as clock
+
+from .eventqueue import backends
+
+
+def owner(target):
+    """ Return the hostname of the node an event handler's object
+        belongs to (the object itself, or its node or startpoint), or
+        None if it doesn't belong to a node. """
+    if target is None:
+        return None
+    for attribute in ('node', 'startpoint'):
+        node = getattr(target, attribute, None)
+        if node is not None:
+            target = node
+            break
+    return getattr(target, 'hostname', None)
 
 
 class Scheduler(object):
-    def __init__(self):
+    def __init__(self, backend='heap'):
+        """ The backend holds the pending events. It is either the name
+            of one of the queues in eventqueue.backends ('heap' or
+            'calendar') or a queue object with the same interface. """
         self.current = 0
         self.count = itertools.count()
-        self.scheduler = sched.scheduler(self.current_time, self.advance_time)
+        if backend in backends:
+            backend = backends[backend]()
+        # queue of [time, key, event, handler] entries; the key is a
+        # sequence number that breaks ties in insertion order and is
+        # unique, so events and handlers are never compared. The entry
+        # itself is the handle returned by add; cancelling it clears the
+        # handler and the run loop skips it when it reaches the front.
+        self.queue = backend
+        # number of cancelled entries still sitting in the queue
+        self.cancelled = 0
 
     def reset(self):
+        """ Discard all pending events and rewind the clock. """
         self.current = 0
+        self.count = itertools.count()
+        self.queue.clear()
+        self.cancelled = 0
 
     def current_time(self):
         return self.current
@@ -17,11 +49,216 @@ class Scheduler(object):
     def advance_time(self, units):
         self.current += units
 
+    def key(self):
+        """ Return the tie-breaking key for a new event. """
+        return next(self.count)
+
     def add(self, delay, event, handler):
-        return self.scheduler.enter(delay, next(self.count), handler, [event])
+        entry = [self.current + delay, next(self.count), event, handler]
+        self.queue.push(entry)
+        return entry
+
+    def add_at(self, time, event, handler):
+        """ Schedule an event at an absolute time, which must not be
+            in the past. """
+        entry = [time, self.key(), event, handler]
+        self.queue.push(entry)
+        return entry
+
+    def add_many(self, events):
+        """ Schedule a batch of (delay, event, handler) tuples and
+            return their handles. The batch is merged into the queue in
+            one step; events with equal times still run in the order
+            they appear in the batch. """
+        current = self.current
+        entries = [[current + delay, self.key(), event, handler] for delay, event, handler in events]
+        self.queue.extend(entries)
+        return entries
 
     def cancel(self, event):
-        self.scheduler.cancel(event)
+        if event[3] is None:
+            return
+        event[3] = None
+        self.cancelled += 1
+        # purge the queue once it is mostly tombstones, so that
+        # frequently re-armed timers don't grow it without bound
+        if self.cancelled > 64 and 2 * self.cancelled > len(self.queue):
+            self.queue.purge()
+            self.cancelled = 0
+
+    def run(self, until=None, max_events=None, profile=None):
+        """ Run events in time order and return how many were run. With
+            no arguments, run until the queue is empty. If until is
+            given, stop before the first event scheduled after that time;
+            the clock stays at the time of the last event run, so that
+            a run split into several calls sees the same times as one
+            that isn't. If max_events is given, stop
+            after running that many events. Events that are not run stay
+            queued, so a later call to run or step resumes where this
+            one stopped. If profile is a Profiler, the run is timed per
+            handler and recorded in it; otherwise there is no overhead. """
+        if profile is not None:
+            return self.run_profiled(until, max_events, profile)
+        if until is not None or max_events is not None:
+            return self.run_bounded(until, max_events)
+        queue = self.queue
+        pop = queue.pop
+        count = 0
+        while queue:
+            entry = pop()
+            handler = entry[3]
+            if handler is None:
+                self.cancelled -= 1
+                continue
+            # advance the clock the way sched.scheduler did, so float
+            # timestamps of existing scenarios replay bit for bit
+            time = entry[0]
+            while self.current < time:
+                self.current += time - self.current
+            # clear the handler so a late cancel is a no-op
+            entry[3] = None
+            handler(entry[2])
+            count += 1
+        return count
+
+    def run_bounded(self, until, max_events):
+        queue = self.queue
+        count = 0
+        while queue:
+            if count == max_events:
+                return count
+            entry = queue.peek()
+            if entry[3] is None:
+                queue.pop()
+                self.cancelled -= 1
+                continue
+            if until is not None and entry[0] > until:
+                break
+            self.step()
+            count += 1
+        return count
+
+    def run_profiled(self, until, max_events, profile):
+        queue = self.queue
+        timer = clock.perf_counter
+        count = 0
+        started = timer()
+        while queue:
+            if count == max_events:
+                break
+            depth = len(queue)
+            if depth > profile.max_depth:
+                profile.max_depth = depth
+            entry = queue.peek()
+            handler = entry[3]
+            if handler is None:
+                queue.pop()
+                self.cancelled -= 1
+                continue
+            time = entry[0]
+            if until is not None and time > until:
+                break
+            queue.pop()
+            while self.current < time:
+                self.current += time - self.current
+            entry[3] = None
+            start = timer()
+            self.call(handler, entry[2])
+            profile.add(getattr(handler, '__qualname__', None) or repr(handler), timer() - start)
+            count += 1
+        profile.events += count
+        profile.wall += timer() - started
+        return count
+
+    def step(self):
+        """ Run the next event. Return False if there was none. """
+        queue = self.queue
+        while queue:
+            entry = queue.pop()
+            handler = entry[3]
+            if handler is None:
+                self.cancelled -= 1
+                continue
+            time = entry[0]
+            while self.current < time:
+                self.current += time - self.current
+            entry[3] = None
+            self.call(handler, entry[2])
+            return True
+        return False
+
+    def call(self, handler, event):
+        """ Run an event's handler (see NodeScheduler). """
+        handler(event)
+
+
+class NodeScheduler(Scheduler):
+    """ Scheduler that breaks ties between simultaneous events by node
+        instead of by insertion order, for parallel simulations (see
+        networks.parallel).
+
+        The key of an event is (creator, count): the hostname of the
+        node whose event scheduled it ('' for events scheduled outside
+        a node's events, e.g. during setup) and the number of events
+        that creator had scheduled before. So simultaneous events from
+        one creator run in the order they were scheduled and those from
+        different nodes in hostname order. Unlike global insertion
+        order, this only depends on what each node did itself, so a
+        simulation split into partitions orders every event the same
+        way as a sequential run with this scheduler. Finding the
+        creator costs a little on every event, which is why it isn't
+        the default. """
+
+    def __init__(self, backend='heap'):
+        Scheduler.__init__(self, backend)
+        # creator of the events scheduled now and the number of events
+        # each creator has scheduled
+        self.creator = ''
+        self.counts = {}
+        # creators of the events run by each handler object
+        self.creators = {}
+
+    def reset(self):
+        Scheduler.reset(self)
+        self.creator = ''
+        self.counts = {}
+        self.creators = {}
+
+    def key(self):
+        creator = self.creator
+        count = self.counts.get(creator, 0)
+        self.counts[creator] = count + 1
+        return creator, count
+
+    def add(self, delay, event, handler):
+        return self.add_at(self.current + delay, event, handler)
+
+    def run(self, until=None, max_events=None, profile=None):
+        if profile is not None:
+            return self.run_profiled(until, max_events, profile)
+        # run_bounded runs every event through step and call
+        return self.run_bounded(until, max_events)
+
+    def creator_of(self, handler):
+        """ Return the creator of the events scheduled while handler
+            runs. """
+        target = getattr(handler, '__self__', None)
+        try:
+            return self.creators[target]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable handler object
+            creator = owner(target)
+            return '' if creator is None else creator
+        creator = owner(target)
+        if len(self.creators) > 4096:
+            # don't keep short-lived handler objects alive for long
+            self.creators.clear()
+        creator = self.creators[target] = '' if creator is None else creator
+        return creator
 
-    def run(self):
-        self.scheduler.run()
+    def call(self, handler, event):
+        self.creator = self.creator_of(handler)
+        handler(event)
+        self.creator = ''
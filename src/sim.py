@@ -1,17 +1,108 @@
 from __future__ import print_function
 
+import hashlib
+import random
+
 from . import scheduler
+from .tracelog import TraceLog
+
+
+class Simulation(object):
+    """ A simulation context. It owns the scheduler and its clock, the
+        random number generator and the trace configuration. Nodes,
+        links and connections are given a simulation when they are
+        created, so several independent simulations can exist in one
+        process. """
+
+    def __init__(self, seed=None, backend='heap', rng=None):
+        self.scheduler = scheduler.Scheduler(backend)
+        self.seed = seed
+        if rng is None:
+            rng = random.Random(seed)
+        self.random = rng
+        self.debug = {}
+        # binary event log; see set_log
+        self.log = None
+        # free lists of dead packets, if set to a packet.PacketPool
+        self.packet_pool = None
+
+    def current_time(self):
+        return self.scheduler.current_time()
+
+    def reset(self):
+        """ Discard all pending events and rewind the clock. """
+        self.scheduler.reset()
+
+    def packet(self, cls, **fields):
+        """ Return a new packet of class cls, reusing a released one if
+            the simulation has a packet pool. """
+        if self.packet_pool is None:
+            return cls(**fields)
+        return self.packet_pool.packet(cls, **fields)
+
+    def release(self, packet):
+        """ Hand a packet that is no longer used to the packet pool. """
+        if self.packet_pool is not None:
+            self.packet_pool.release(packet)
+
+    def stream(self, name):
+        """ Return a new random number generator for the part of the
+            simulation identified by name (any value with a stable
+            repr). Its seed is derived from the simulation's seed and
+            the name, so each part draws the same numbers no matter how
+            its events interleave with the rest of the simulation. If
+            the simulation has no seed, each stream's seed is drawn from
+            its random number generator instead, so reseeding that
+            generator (random.seed() for Sim.default) still controls
+            the streams created afterwards. """
+        seed = self.seed
+        if seed is None:
+            seed = self.random.getrandbits(64)
+        digest = hashlib.sha256(repr((seed, name)).encode("utf-8"))
+        return random.Random(int(digest.hexdigest()[:16], 16))
+
+    def set_debug(self, kind):
+        self.debug[kind] = True
+
+    def set_log(self, path, records=65536):
+        """ Start writing a binary event log to path. The log must be
+            closed with close_log when the simulation is done. """
+        self.log = TraceLog(path, self, records)
+
+    def close_log(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def trace(self, kind, message, *args):
+        """ Print a trace message if tracing is enabled for its kind.
+            Formatting is deferred until then: the message is
+            %-formatted with args if there are any, and called to
+            produce the text if it is callable. Call sites on hot paths
+            also check `__debug__ and kind in sim.debug` before calling,
+            so that a disabled trace costs one dictionary lookup and
+            running under python -O removes it entirely. """
+        if kind in self.debug:
+            if args:
+                message = message % args
+            elif callable(message):
+                message = message()
+            print(self.scheduler.current_time(), message)
 
 
 class Sim(object):
-    scheduler = scheduler.Scheduler()
-    debug = {}
+    """ Global access to the default simulation, which is used by any
+        object that is not given a simulation of its own. It draws from
+        the random module, so random.seed() still controls it. """
+
+    default = Simulation(rng=random)
+    scheduler = default.scheduler
+    debug = default.debug
 
     @staticmethod
     def set_debug(kind):
-        Sim.debug[kind] = True
+        Sim.default.set_debug(kind)
 
     @staticmethod
-    def trace(kind, message):
-        if kind in Sim.debug:
-            print(Sim.scheduler.current_time(), message)
+    def trace(kind, message, *args):
+        Sim.default.trace(kind, message, *args)
@@ -0,0 +1,152 @@
+from __future__ import print_function
+
+import concurrent.futures
+import itertools
+import math
+import multiprocessing
+
+# two-sided 95% critical values of Student's t distribution, indexed by
+# degrees of freedom; larger samples use the normal approximation
+t_values = [None, 12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+            2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+            2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+class Statistic(object):
+    """ Running mean and variance of one metric (Welford's method). """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    def confidence(self):
+        """ Half-width of the 95% confidence interval of the mean. """
+        if self.count < 2:
+            return float('nan')
+        df = self.count - 1
+        t = t_values[df] if df < len(t_values) else 1.960
+        return t * math.sqrt(self.variance() / self.count)
+
+
+class Results(object):
+    """ Aggregated sweep results: one Statistic per metric for every
+        parameter point. """
+
+    def __init__(self, names):
+        self.names = names
+        self.points = {}
+        self.metrics = []
+
+    def add(self, point, metrics):
+        stats = self.points.setdefault(point, {})
+        for metric, value in metrics.items():
+            if metric not in self.metrics:
+                self.metrics.append(metric)
+            stats.setdefault(metric, Statistic()).add(value)
+
+    def rows(self):
+        """ Return one dictionary per parameter point, holding the
+            parameters, the number of runs and the mean and confidence
+            interval half-width of every metric. """
+        rows = []
+        for point in sorted(self.points):
+            row = dict(zip(self.names, point))
+            stats = self.points[point]
+            for metric in self.metrics:
+                stat = stats.get(metric)
+                if stat is None:
+                    continue
+                row['runs'] = stat.count
+                row[metric] = stat.mean
+                row[metric + '_ci'] = stat.confidence()
+            rows.append(row)
+        return rows
+
+    def format(self):
+        header = ['%12s' % name for name in self.names + ['runs']]
+        header += ['%22s' % metric for metric in self.metrics]
+        lines = [' '.join(header)]
+        for row in self.rows():
+            fields = ['%12s' % row[name] for name in self.names]
+            fields.append('%12d' % row['runs'])
+            for metric in self.metrics:
+                fields.append('%22s' % ('%.4g +- %.2g' % (row[metric], row[metric + '_ci'])))
+            lines.append(' '.join(fields))
+        return '\n'.join(lines)
+
+
+def run_job(job):
+    scenario, names, point, seed = job
+    return point, scenario(seed=seed, **dict(zip(names, point)))
+
+
+class Sweep(object):
+    """ Run a scenario over a grid of parameters in a pool of worker
+        processes.
+
+        The scenario is a module-level function called as
+        scenario(seed=seed, **parameters) that builds its own Simulation
+        and returns a dictionary of numeric metrics. The grid maps each
+        parameter name to the list of values to try; every combination
+        is run once per seed. Workers live for the whole sweep, so the
+        modules they import and the topologies they parse (see
+        networks.topology.load) are reused across jobs. If given, setup
+        is a module-level function that each worker calls once before
+        its first job, for example to parse those topologies up front.
+        """
+
+    def __init__(self, scenario, grid, seeds=10, workers=None, setup=None):
+        self.scenario = scenario
+        self.names = sorted(grid)
+        self.grid = grid
+        if isinstance(seeds, int):
+            seeds = range(1, seeds + 1)
+        self.seeds = list(seeds)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.setup = setup
+
+    def jobs(self):
+        values = [self.grid[name] for name in self.names]
+        for point in itertools.product(*values):
+            for seed in self.seeds:
+                yield self.scenario, self.names, point, seed
+
+    def run(self, progress=None):
+        """ Run every job and return the aggregated Results. If given,
+            progress is called with (point, metrics) as each run
+            completes. """
+        results = Results(self.names)
+        jobs = list(self.jobs())
+        if self.workers == 1:
+            if self.setup:
+                self.setup()
+            completed = map(run_job, jobs)
+            self.collect(results, completed, progress)
+            return results
+        # hand out jobs in chunks to keep inter-process traffic low,
+        # while still leaving several chunks per worker for balance
+        chunksize = max(1, len(jobs) // (4 * self.workers))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                    initializer=self.setup) as executor:
+            completed = executor.map(run_job, jobs, chunksize=chunksize)
+            self.collect(results, completed, progress)
+        return results
+
+    @staticmethod
+    def collect(results, completed, progress):
+        for point, metrics in completed:
+            results.add(point, metrics)
+            if progress:
+                progress(point, metrics)
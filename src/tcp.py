@@ -1,6 +1,7 @@
 from .buffer import SendBuffer, ReceiveBuffer
+from . import congestion as cc
+from . import tracelog
 from .connection import Connection
-from .sim import Sim
 from .tcppacket import TCPPacket
 
 
@@ -8,7 +9,31 @@ class TCP(Connection):
     """ A TCP connection between two hosts."""
 
     def __init__(self, transport, source_address, source_port,
-                 destination_address, destination_port, app=None, window=1000):
+                 destination_address, destination_port, app=None, window=1000,
+                 congestion='newreno', history=False, delayed_ack=False, ack_delay=0.1,
+                 quickack=16):
+        """ window is the largest number of bytes the sender keeps
+            outstanding, whatever the congestion window. congestion is
+            the congestion control algorithm, either the name of one in
+            congestion.algorithms ('reno', 'newreno' or 'cubic') or an
+            object with the same interface. If history is true, every
+            change of the congestion window is recorded in self.history
+            as a (time, cwnd, ssthresh) tuple.
+
+            With delayed_ack, the receiver acknowledges every second
+            full segment, or the data received so far once ack_delay
+            seconds have passed since the first unacknowledged segment.
+            Out of order data and data that fills a gap are still
+            acknowledged at once, so the sender's duplicate ACKs and
+            recovery work as without it. So are the first quickack
+            segments of the connection, and the next quickack segments
+            after a loss shows up as out of order or duplicate data
+            (Linux's quick ACK mode): while the sender's congestion
+            window is a segment or two, waiting for a second segment
+            would stall it for ack_delay and halve the growth of its
+            window in slow start. A send window smaller than two
+            segments still stalls every segment after those, as it would
+            with a real delayed-ACK receiver. """
         Connection.__init__(self, transport, source_address, source_port,
                             destination_address, destination_port, app)
 
@@ -24,10 +49,44 @@ class TCP(Connection):
         # largest sequence number that has been ACKed so far; represents
         # the next sequence number the client expects to receive
         self.sequence = 0
-        # retransmission timer
+        # retransmission timer: the pending timer event, if any, and
+        # the time the timer actually expires, or None if it is
+        # stopped. Restarting the timer only moves the deadline; when
+        # the event fires before it, it is scheduled again for the
+        # deadline.
         self.timer = None
-        # timeout duration in seconds
+        self.deadline = None
+        # retransmission timeout in seconds (RFC 6298), starting at one
+        # second and then computed from the smoothed round-trip time
+        # and its variation, within the given bounds
         self.timeout = 1
+        self.min_timeout = 0.2
+        self.max_timeout = 60
+        self.srtt = None
+        self.rttvar = None
+        # the segment being timed for a round-trip time sample, as the
+        # sequence number that acknowledges it and the time it was sent
+        self.timed = None
+        # congestion control
+        if congestion in cc.algorithms:
+            congestion = cc.algorithms[congestion]()
+        self.congestion = congestion
+        self.congestion.attach(self)
+        # duplicate ACKs received in a row
+        self.dup_acks = 0
+        # whether the sender is in fast recovery, and the sequence
+        # number it had sent up to when it last entered recovery or
+        # timed out; duplicate ACKs below it don't start a new recovery
+        self.recovering = False
+        self.recover = 0
+        self.history = [] if history else None
+        # statistics; segments below the highest sequence number sent
+        # so far count as retransmissions
+        self.highest = 0
+        self.segments_sent = 0
+        self.retransmissions = 0
+        self.fast_retransmits = 0
+        self.timeouts = 0
 
         # -- Receiver functionality
 
@@ -36,10 +95,24 @@ class TCP(Connection):
         # ack number to send; represents the largest in-order sequence
         # number not yet received
         self.ack = 0
+        # number of bytes given to the application
+        self.received = 0
+        # delayed ACKs: bytes received since the last ACK, and a timer
+        # like the retransmission timer, with one pending event and the
+        # time the ACK is due
+        self.delayed_ack = delayed_ack
+        self.ack_delay = ack_delay
+        self.unacked = 0
+        # segments still to be acknowledged at once
+        self.quickack = quickack
+        self.quickacks = quickack
+        self.ack_timer = None
+        self.ack_deadline = None
+        self.acks_sent = 0
 
-    def trace(self, message):
+    def trace(self, message, *args):
         """ Print debugging messages. """
-        Sim.trace("TCP", message)
+        self.sim.trace("TCP", message, *args)
 
     def receive_packet(self, packet):
         """ Receive a packet from the network layer. """
@@ -49,66 +122,257 @@ class TCP(Connection):
         if packet.length > 0:
             # handle data
             self.handle_data(packet)
+        # a unicast segment is only delivered here, and the receive
+        # buffer keeps its body, not the packet; a broadcast one is
+        # still used by the node that delivered it
+        if packet.destination_address != 0:
+            self.sim.release(packet)
 
     ''' Sender '''
 
     def send(self, data):
-        """ Send data on the connection. Called by the application. This
-            code currently sends all data immediately. """
-        self.send_packet(data, self.sequence)
-        self.timer = Sim.scheduler.add(delay=self.timeout, event='retransmit', handler=self.retransmit)
+        """ Send data on the connection. Called by the application. The
+            data is buffered and sent as the window allows. """
+        self.send_buffer.put(data)
+        self.fill()
+
+    def fill(self):
+        """ Send new data while the send and congestion windows allow,
+            in segments of at most one MSS, or of the send window if
+            that is smaller. A smaller segment is only sent if it is all
+            the data there is. """
+        buffer = self.send_buffer
+        window = min(self.window, int(self.congestion.cwnd))
+        while True:
+            room = window - buffer.outstanding()
+            size = min(self.mss, self.window, buffer.available())
+            if size <= 0 or room < size:
+                return
+            data, sequence = buffer.get(size)
+            self.send_packet(data, sequence)
 
     def send_packet(self, data, sequence):
-        packet = TCPPacket(source_address=self.source_address,
-                           source_port=self.source_port,
-                           destination_address=self.destination_address,
-                           destination_port=self.destination_port,
-                           body=data,
-                           sequence=sequence, ack_number=self.ack)
+        packet = self.sim.packet(TCPPacket, source_address=self.source_address,
+                                 source_port=self.source_port,
+                                 destination_address=self.destination_address,
+                                 destination_port=self.destination_port,
+                                 body=data,
+                                 sequence=sequence, ack_number=self.ack)
 
         # send the packet
-        self.trace("%s (%d) sending TCP segment to %d for %d" % (
-            self.node.hostname, self.source_address, self.destination_address, packet.sequence))
+        if __debug__ and "TCP" in self.sim.debug:
+            self.trace("%s (%d) sending TCP segment to %d for %d",
+                       self.node.hostname, self.source_address, self.destination_address, packet.sequence)
+        if self.sim.log is not None:
+            self.sim.log.packet(tracelog.TCP_SEND, self.source_address, packet, packet.sequence)
+        self.segments_sent += 1
+        # the segment acknowledges everything received
+        self.unacked = 0
+        self.ack_deadline = None
+        if sequence < self.highest:
+            self.retransmissions += 1
+            # Karn's algorithm: an ACK can't tell which copy of a
+            # retransmitted segment arrived, so don't time it
+            self.timed = None
+        else:
+            self.highest = sequence + len(data)
+            if self.timed is None:
+                self.timed = (self.highest, self.sim.scheduler.current_time())
         self.transport.send_packet(packet)
 
         # set a timer
-        if not self.timer:
-            self.timer = Sim.scheduler.add(delay=self.timeout, event='retransmit', handler=self.retransmit)
+        if self.deadline is None:
+            self.start_timer()
+
+    def resend(self):
+        """ Retransmit the first unacknowledged segment, for fast
+            retransmit and partial ACKs. """
+        data, sequence = self.send_buffer.resend(min(self.mss, self.window), reset=False)
+        if data:
+            if self.sim.log is not None:
+                self.sim.log.record(tracelog.TCP_RETRANSMIT, self.source_address, value=sequence)
+            self.send_packet(data, sequence)
 
     def handle_ack(self, packet):
         """ Handle an incoming ACK. """
-        self.cancel_timer()
+        buffer = self.send_buffer
+        ack = packet.ack_number
+        now = self.sim.scheduler.current_time()
+        if ack > buffer.base_seq:
+            # new data is acknowledged
+            acked = ack - buffer.base_seq
+            buffer.slide(ack)
+            if self.timed is not None and ack >= self.timed[0]:
+                self.measure(now - self.timed[1])
+                self.timed = None
+            self.sequence = ack
+            self.dup_acks = 0
+            if not self.recovering:
+                self.congestion.ack(acked, now)
+            elif ack >= self.recover:
+                self.recovering = False
+                self.congestion.exit_recovery()
+            elif self.congestion.partial_ack(acked):
+                self.resend()
+            else:
+                self.recovering = False
+                self.congestion.exit_recovery()
+            self.window_changed()
+            # restart the timer for the remaining data
+            if buffer.outstanding() > 0:
+                self.start_timer()
+            else:
+                self.cancel_timer()
+            self.fill()
+        elif ack == buffer.base_seq and packet.length == 0 and buffer.outstanding() > 0:
+            self.dup_acks += 1
+            if self.recovering:
+                self.congestion.dup_ack()
+                self.window_changed()
+                self.fill()
+            elif self.dup_acks == 3 and ack >= self.recover:
+                # fast retransmit
+                if __debug__ and "TCP" in self.sim.debug:
+                    self.trace("%s (%d) fast retransmit of %d",
+                               self.node.hostname, self.source_address, ack)
+                self.recovering = True
+                self.recover = buffer.next_seq
+                self.fast_retransmits += 1
+                self.congestion.enter_recovery(buffer.outstanding(), now)
+                self.window_changed()
+                self.resend()
+                self.fill()
+
+    def measure(self, rtt):
+        """ Update the retransmission timeout with a round-trip time
+            sample (Jacobson and Karels, as in RFC 6298). """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2.0
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.timeout = min(max(self.srtt + 4 * self.rttvar, self.min_timeout), self.max_timeout)
+        self.congestion.rtt = self.srtt
+
+    def start_timer(self):
+        """ (Re)start the retransmission timer. """
+        self.deadline = self.sim.scheduler.current_time() + self.timeout
+        if self.timer is not None and self.timer[0] > self.deadline:
+            # the timeout has become shorter
+            self.sim.scheduler.cancel(self.timer)
+            self.timer = None
+        if self.timer is None:
+            self.timer = self.sim.scheduler.add_at(self.deadline, 'retransmit', self.retransmit)
 
     def retransmit(self, event):
         """ Retransmit data. """
-        self.trace("%s (%d) retransmission timer fired" % (self.node.hostname, self.source_address))
+        self.timer = None
+        if self.deadline is None:
+            return
+        if self.sim.scheduler.current_time() < self.deadline:
+            # the timer was restarted since this event was scheduled
+            self.timer = self.sim.scheduler.add_at(self.deadline, 'retransmit', self.retransmit)
+            return
+        self.deadline = None
+        buffer = self.send_buffer
+        if buffer.outstanding() == 0:
+            return
+        if __debug__ and "TCP" in self.sim.debug:
+            self.trace("%s (%d) retransmission timer fired",
+                       self.node.hostname, self.source_address)
+        if self.sim.log is not None:
+            self.sim.log.record(tracelog.TCP_RETRANSMIT, self.source_address, value=buffer.base_seq)
+        self.timeouts += 1
+        # back off until a new sample comes in
+        self.timeout = min(2 * self.timeout, self.max_timeout)
+        self.congestion.timeout(buffer.outstanding(), self.sim.scheduler.current_time())
+        self.window_changed()
+        self.recovering = False
+        self.recover = buffer.next_seq
+        self.dup_acks = 0
+        # everything outstanding is sent again, starting with the
+        # first segment
+        data, sequence = buffer.resend(min(self.mss, self.window))
+        self.send_packet(data, sequence)
+        self.fill()
+
+    def window_changed(self):
+        """ Record the congestion window. """
+        if self.history is not None:
+            self.history.append((self.sim.scheduler.current_time(), self.congestion.cwnd, self.congestion.ssthresh))
+        if self.sim.log is not None:
+            self.sim.log.record(tracelog.TCP_CWND, self.source_address, value=int(self.congestion.cwnd))
 
     def cancel_timer(self):
-        """ Cancel the timer. """
-        if not self.timer:
-            return
-        Sim.scheduler.cancel(self.timer)
-        self.timer = None
+        """ Stop the timer, once all data is acknowledged. """
+        self.deadline = None
+        if self.timer is not None:
+            self.sim.scheduler.cancel(self.timer)
+            self.timer = None
 
     ''' Receiver '''
 
     def handle_data(self, packet):
-        """ Handle incoming data. This code currently gives all data to
-            the application, regardless of whether it is in order, and sends
-            an ACK."""
-        self.trace("%s (%d) received TCP segment from %d for %d" % (
-            self.node.hostname, packet.destination_address, packet.source_address, packet.sequence))
-        self.app.receive_data(packet.body)
+        """ Handle incoming data. Data is put in the receive buffer,
+            everything that is now in order is given to the application
+            and the ACK is for the next byte that is missing. Out of
+            order data causes a duplicate ACK. """
+        if __debug__ and "TCP" in self.sim.debug:
+            self.trace("%s (%d) received TCP segment from %d for %d",
+                       self.node.hostname, packet.destination_address, packet.source_address, packet.sequence)
+        buffer = self.receive_buffer
+        gap = bool(buffer.starts)
+        buffer.put(packet.body, packet.sequence)
+        data, start = buffer.get()
+        if data:
+            self.ack = buffer.base_seq
+            self.received += len(data)
+            self.app.receive_data(data)
+        if not self.delayed_ack:
+            self.send_ack()
+            return
+        if packet.sequence != start or gap or buffer.starts:
+            # the sender lost data and is about to shrink its window
+            self.quickacks = self.quickack
+            self.send_ack()
+            return
+        if self.quickacks > 0:
+            self.quickacks -= 1
+            self.send_ack()
+            return
+        self.unacked += packet.length
+        if self.unacked >= 2 * self.mss:
+            self.send_ack()
+        elif self.ack_deadline is None:
+            self.ack_deadline = self.sim.scheduler.current_time() + self.ack_delay
+            if self.ack_timer is None:
+                self.ack_timer = self.sim.scheduler.add_at(self.ack_deadline, 'ack', self.delayed_ack_timeout)
+
+    def delayed_ack_timeout(self, event):
+        """ Send a delayed ACK that is due. """
+        self.ack_timer = None
+        if self.ack_deadline is None:
+            return
+        if self.sim.scheduler.current_time() < self.ack_deadline:
+            self.ack_timer = self.sim.scheduler.add_at(self.ack_deadline, 'ack', self.delayed_ack_timeout)
+            return
         self.send_ack()
 
     def send_ack(self):
         """ Send an ack. """
-        packet = TCPPacket(source_address=self.source_address,
-                           source_port=self.source_port,
-                           destination_address=self.destination_address,
-                           destination_port=self.destination_port,
-                           sequence=self.sequence, ack_number=self.ack)
+        packet = self.sim.packet(TCPPacket, source_address=self.source_address,
+                                 source_port=self.source_port,
+                                 destination_address=self.destination_address,
+                                 destination_port=self.destination_port,
+                                 sequence=self.sequence, ack_number=self.ack)
         # send the packet
-        self.trace("%s (%d) sending TCP ACK to %d for %d" % (
-            self.node.hostname, self.source_address, self.destination_address, packet.ack_number))
+        if __debug__ and "TCP" in self.sim.debug:
+            self.trace("%s (%d) sending TCP ACK to %d for %d",
+                       self.node.hostname, self.source_address, self.destination_address, packet.ack_number)
+        if self.sim.log is not None:
+            self.sim.log.packet(tracelog.TCP_ACK, self.source_address, packet, packet.ack_number)
+        self.unacked = 0
+        self.ack_deadline = None
+        self.acks_sent += 1
         self.transport.send_packet(packet)
@@ -2,6 +2,8 @@ from .packet import Packet
 
 
 class TCPPacket(Packet):
+    __slots__ = ('sequence', 'ack_number')
+
     def __init__(self, source_address=1, source_port=0,
                  destination_address=1, destination_port=0,
                  ident=0, ttl=100, protocol="TCP", body="", length=0,
@@ -0,0 +1,120 @@
+import struct
+
+# record kinds
+ENQUEUE = 1
+DROP = 2
+TRANSMIT = 3
+RECEIVE = 4
+FORWARD = 5
+TCP_SEND = 6
+TCP_ACK = 7
+TCP_RETRANSMIT = 8
+TCP_CWND = 9
+
+kinds = {
+    ENQUEUE: 'enqueue',
+    DROP: 'drop',
+    TRANSMIT: 'transmit',
+    RECEIVE: 'receive',
+    FORWARD: 'forward',
+    TCP_SEND: 'tcp_send',
+    TCP_ACK: 'tcp_ack',
+    TCP_RETRANSMIT: 'tcp_retransmit',
+    TCP_CWND: 'tcp_cwnd',
+}
+
+# reasons stored in the value field of DROP records
+OVERFLOW = 1
+LOSS = 2
+TTL = 3
+NO_ROUTE = 4
+LINK_DOWN = 5
+# dropped by an active queue discipline such as RED or CoDel
+EARLY = 6
+
+# time, kind, where, ident, value, length
+record_format = struct.Struct('<dB3xiqqi4x')
+
+# the same layout as a NumPy dtype, for reading the log back
+dtype_fields = [('time', '<f8'), ('kind', 'u1'), ('pad', 'V3'), ('where', '<i4'),
+                ('ident', '<i8'), ('value', '<i8'), ('length', '<i4'), ('pad2', 'V4')]
+
+
+class TraceLog(object):
+    """ Binary event log. Every record has the same fixed-width layout
+        (record_format): the simulated time, the kind of event, where it
+        happened, the packet's ident, a kind-specific value and the
+        packet's length.
+
+        where is the link address for link events (ENQUEUE, DROP at a
+        link, TRANSMIT), the node number for node events (RECEIVE,
+        FORWARD, DROP at a node) and the connection's source address
+        for TCP events. Node numbers index the list of hostnames written
+        to path + '.nodes'. value is the destination address for
+        FORWARD, the drop reason for DROP, the sequence number for
+        TCP_SEND and TCP_RETRANSMIT, the ACK number for TCP_ACK and the
+        congestion window in bytes for TCP_CWND.
+        Packets whose ident is not an integer are logged with ident -1.
+
+        Records are packed into a preallocated buffer that is written
+        out whenever it fills up and when the log is closed. """
+
+    def __init__(self, path, sim, records=65536):
+        self.path = path
+        self.sim = sim
+        self.file = open(path, 'wb')
+        self.buffer = bytearray(records * record_format.size)
+        self.view = memoryview(self.buffer)
+        self.offset = 0
+        self.nodes = {}
+        self.hostnames = []
+
+    def node(self, hostname):
+        """ Return the number of a node, assigning one on first use. """
+        number = self.nodes.get(hostname)
+        if number is None:
+            number = self.nodes[hostname] = len(self.hostnames)
+            self.hostnames.append(hostname)
+        return number
+
+    def record(self, kind, where, ident=0, value=0, length=0):
+        if self.offset == len(self.buffer):
+            self.flush()
+        try:
+            record_format.pack_into(self.buffer, self.offset, self.sim.scheduler.current,
+                                    kind, where, ident, value, length)
+        except struct.error:
+            record_format.pack_into(self.buffer, self.offset, self.sim.scheduler.current,
+                                    kind, where, -1, value, length)
+        self.offset += record_format.size
+
+    def packet(self, kind, where, packet, value=0):
+        self.record(kind, where, packet.ident, value, packet.length)
+
+    def flush(self):
+        self.file.write(self.view[:self.offset])
+        self.offset = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        with open(self.path + '.nodes', 'w') as f:
+            for hostname in self.hostnames:
+                f.write(hostname + '\n')
+
+
+def load(path, mmap=False):
+    """ Load a log written by TraceLog as a NumPy structured array with
+        the fields time, kind, where, ident, value and length. With mmap,
+        the file is memory-mapped instead of read. """
+    import numpy
+    dtype = numpy.dtype(dtype_fields)
+    if mmap:
+        return numpy.memmap(path, dtype=dtype, mode='r')
+    return numpy.fromfile(path, dtype=dtype)
+
+
+def hostnames(path):
+    """ Return the hostnames of the nodes numbered in a log. """
+    with open(path + '.nodes') as f:
+        return [line.rstrip('\n') for line in f]
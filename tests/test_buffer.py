@@ -0,0 +1,45 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.buffer import ReceiveBuffer
+
+
+class ReceiveBufferTest(unittest.TestCase):
+    def test_empty_put(self):
+        buffer = ReceiveBuffer()
+        buffer.put(b'abc', 10)
+        buffer.put(b'', 886)
+        buffer.put(b'', 5)
+        buffer.put(memoryview(b''), 13)
+        self.assertEqual(buffer.intervals(), [(10, 13)])
+        self.assertEqual(buffer.get(), (b'', 0))
+
+    def test_random_order(self):
+        generator = random.Random(1)
+        stream = bytes(bytearray(generator.randrange(256) for _ in range(2000)))
+        buffer = ReceiveBuffer()
+        received = b''
+        have = set()
+        for _ in range(500):
+            start = generator.randrange(len(stream))
+            size = generator.randrange(0, 60)
+            buffer.put(memoryview(stream)[start:start + size], start)
+            have.update(range(start, min(start + size, len(stream))))
+            if generator.random() < 0.2:
+                data, start = buffer.get()
+                self.assertEqual(start, len(received))
+                received += data
+                self.assertEqual(received, stream[:len(received)])
+            pending = set(i for i in have if i >= buffer.base_seq)
+            intervals = buffer.intervals()
+            self.assertEqual(set(i for start, end in intervals for i in range(start, end)), pending)
+            for (_, end), (start, _) in zip(intervals, intervals[1:]):
+                self.assertLess(end, start)
+
+
+if __name__ == '__main__':
+    unittest.main()
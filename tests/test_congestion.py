@@ -0,0 +1,101 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.congestion import Cubic
+
+
+class Sender(object):
+    """ Stands in for the TCP sender a congestion control is attached
+        to. """
+    mss = 1000
+
+
+def cubic(window, rtt=0.1):
+    """ Return a Cubic that has just recovered from a loss at a window
+        of that many segments. """
+    congestion = Cubic()
+    congestion.attach(Sender())
+    congestion.rtt = rtt
+    congestion.cwnd = window * 1000.0
+    congestion.enter_recovery(congestion.cwnd, 0)
+    congestion.exit_recovery()
+    return congestion
+
+
+def rounds(congestion, count, rtt=0.1):
+    """ Acknowledge a window of segments per round trip, starting at
+        time 0; return the time, window and whether it was Reno-friendly
+        after each round, with windows in segments. """
+    now = 0.0
+    result = []
+    for _ in range(count):
+        for _ in range(int(congestion.cwnd / 1000)):
+            congestion.ack(1000, now)
+        now += rtt
+        result.append((now, congestion.cwnd / 1000, congestion.cwnd == congestion.estimate))
+    return result
+
+
+def curve(w_max, t):
+    """ The cubic window, in segments, t seconds after a loss at w_max. """
+    k = (w_max * (1 - Cubic.beta) / Cubic.c) ** (1.0 / 3)
+    return Cubic.c * (t - k) ** 3 + w_max
+
+
+class CubicTest(unittest.TestCase):
+    def test_loss(self):
+        congestion = cubic(100)
+        self.assertEqual((congestion.w_max, congestion.ssthresh, congestion.cwnd), (100000, 70000, 70000))
+        # a loss before the window is back at w_max lowers w_max further
+        # (fast convergence)
+        congestion.cwnd = 90000.0
+        congestion.timeout(90000, 1)
+        self.assertAlmostEqual(congestion.w_max, 90000 * 1.7 / 2)
+        self.assertAlmostEqual(congestion.ssthresh, 63000)
+        self.assertEqual(congestion.cwnd, 1000)
+        # slow start up to ssthresh, then back to the curve
+        for _ in range(62):
+            congestion.ack(1000, 1)
+        self.assertEqual(congestion.cwnd, 63000)
+        self.assertEqual(congestion.epoch, None)
+        congestion.ack(1000, 1)
+        self.assertEqual(congestion.epoch, 1)
+        self.assertEqual(congestion.origin, congestion.w_max)
+
+    def test_curve(self):
+        # with a large window the cubic function is faster than Reno
+        # throughout: the window climbs quickly back to w_max, stays
+        # near it and then grows quickly again
+        trajectory = rounds(cubic(400), 150)
+        for now, window, friendly in trajectory:
+            self.assertFalse(friendly)
+            self.assertTrue(abs(window - curve(400, now)) < 0.01 * window, (now, window))
+        k = (400 * 0.3 / 0.4) ** (1.0 / 3)
+        windows = dict((round(now, 1), window) for now, window, _ in trajectory)
+        self.assertTrue(windows[round(k / 2, 1)] > 370)
+        self.assertTrue(abs(windows[round(k, 1)] - 400) < 1)
+        self.assertTrue(windows[round(2 * k, 1)] > 430)
+
+    def test_reno_friendly(self):
+        # with a small window Reno would grow faster than the curve
+        # once it flattens out near w_max; from then on the window
+        # grows like Reno's, by 3 (1 - beta) / (1 + beta) segments per
+        # round trip
+        trajectory = rounds(cubic(40), 50)
+        modes = [friendly for _, _, friendly in trajectory]
+        switch = modes.index(True)
+        self.assertTrue(10 < switch < 30)
+        self.assertEqual(modes[switch:], [True] * (50 - switch))
+        for now, window, _ in trajectory[:switch]:
+            self.assertTrue(abs(window - curve(40, now)) < 1, (now, window))
+        alpha = 3 * (1 - Cubic.beta) / (1 + Cubic.beta)
+        growth = [b[1] - a[1] for a, b in zip(trajectory[switch:], trajectory[switch + 1:])]
+        for step in growth:
+            self.assertTrue(abs(step - alpha) < 0.02, step)
+
+
+if __name__ == '__main__':
+    unittest.main()
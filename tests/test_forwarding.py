@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.forwarding import ForwardingTable
+
+
+def linear(routes, address):
+    """ Longest-prefix match by trying every route. """
+    best = None
+    for (prefix, length), link in routes.items():
+        if address >> (32 - length) == prefix and (best is None or length > best[0]):
+            best = length, link
+    return None if best is None else best[1]
+
+
+class ForwardingTableTest(unittest.TestCase):
+    def test_random_against_linear(self):
+        generator = random.Random(1)
+        links = ['a', 'b', 'c']
+        for aggregated in (False, True):
+            table = ForwardingTable()
+            routes = {}
+            # a small address space, so that routes overlap and merge
+            addresses = [generator.randrange(64) << 24 | generator.randrange(4) for _ in range(40)]
+            for step in range(3000):
+                address = generator.choice(addresses)
+                length = generator.choice([8, 16, 24, 30, 31, 32])
+                prefix = address >> (32 - length)
+                if generator.random() < 0.6:
+                    link = generator.choice(links)
+                    table.add(prefix, length, link)
+                    routes[(prefix, length)] = link
+                else:
+                    table.remove(prefix, length)
+                    routes.pop((prefix, length), None)
+                if aggregated and step == 100:
+                    table.aggregate()
+                for address in generator.sample(addresses, 5):
+                    self.assertEqual(table.lookup(address), linear(routes, address))
+            for (prefix, length), link in routes.items():
+                self.assertEqual(table.get(prefix, length), link)
+
+    def test_aggregate(self):
+        table = ForwardingTable()
+        for address in range(8, 16):
+            table.add(address, 32, 'a')
+        table.aggregate()
+        self.assertEqual(table.items(), [((1, 29), 'a')])
+        table.add(9, 32, 'b')
+        self.assertEqual(table.lookup(9), 'b')
+        self.assertEqual(table.lookup(8), 'a')
+        self.assertEqual(table.lookup(15), 'a')
+        self.assertEqual(table.lookup(16), None)
+
+    def test_cache_is_bounded(self):
+        table = ForwardingTable()
+        table.add(0, 0, 'default')
+        for address in range(3 * table.cache_size):
+            self.assertEqual(table.lookup(address), 'default')
+        self.assertTrue(len(table.cache) <= table.cache_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.packet import Packet
+from src.sim import Simulation
+
+from networks.network import Network
+
+try:
+    import numpy
+    from src import batch
+except ImportError:
+    numpy = None
+
+config = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'networks', 'one-hop.txt')
+
+
+class Sink(object):
+    def __init__(self, sim):
+        self.sim = sim
+        self.packets = []
+
+    def receive_packet(self, packet):
+        self.packets.append((packet.ident, self.sim.scheduler.current_time(), packet.queueing_delay))
+
+
+class Periodic(object):
+    """ Sends packets of the given lengths one period apart from a
+        handler of the node, so the link's finish events tie with
+        arrivals. """
+
+    def __init__(self, node, destination, period, lengths):
+        self.node = node
+        self.sim = node.sim
+        self.destination = destination
+        self.period = period
+        self.lengths = lengths
+        self.sent = 0
+
+    def handle(self, event):
+        packet = Packet(destination_address=self.destination, ident=self.sent, protocol='sink',
+                        length=self.lengths[self.sent])
+        self.sent += 1
+        self.sim.scheduler.add(delay=0, event=packet, handler=self.node.send_packet)
+        if self.sent < len(self.lengths):
+            self.sim.scheduler.add(delay=self.period, event='generate', handler=self.handle)
+
+
+def setup(analytic, queue_size):
+    sim = Simulation(seed=1)
+    net = Network(config, sim=sim)
+    n1 = net.get_node('n1')
+    n2 = net.get_node('n2')
+    n1.add_forwarding_entry(address=n2.get_address('n1'), link=n1.links[0])
+    n1.links[0].queue_size = queue_size
+    n1.links[0].analytic = analytic
+    sink = Sink(sim)
+    n2.add_protocol(protocol='sink', handler=sink)
+    return sim, n1, n2, sink
+
+
+def periodic(analytic, period, lengths, queue_size):
+    sim, n1, n2, sink = setup(analytic, queue_size)
+    generator = Periodic(n1, n2.get_address('n1'), period, lengths)
+    sim.scheduler.add(delay=0, event='generate', handler=generator.handle)
+    sim.scheduler.run()
+    return sink.packets
+
+
+def scheduled(analytic, times, lengths, queue_size):
+    """ Packets scheduled up front, outside any node's events. """
+    sim, n1, n2, sink = setup(analytic, queue_size)
+    for ident, (time, length) in enumerate(zip(times, lengths)):
+        packet = Packet(destination_address=n2.get_address('n1'), ident=ident, protocol='sink', length=length)
+        sim.scheduler.add(delay=time, event=packet, handler=n1.send_packet)
+    sim.scheduler.run()
+    return sink.packets
+
+
+class AnalyticTest(unittest.TestCase):
+    def check(self, packets, times, lengths, queue_size):
+        """ Compare with the batch computation, if NumPy is installed. """
+        if numpy is None:
+            return
+        result = batch.run(numpy.array(times), numpy.array(lengths, dtype=float), [FakeLink(queue_size)])
+        delivered = [(ident, received) for ident, received in enumerate(result.received.tolist())
+                     if not result.dropped[ident]]
+        self.assertEqual([ident for ident, _ in delivered], [packet[0] for packet in packets])
+        for (_, received), packet in zip(delivered, packets):
+            self.assertAlmostEqual(received, packet[1], places=9)
+
+    def test_ties_with_finish_events(self):
+        # 1000 bytes take 8 ms at 1 Mbps, so with a packet every 4 ms
+        # arrivals coincide with the end of every other transmission
+        lengths = [1000] * 200
+        for queue_size in (1, 2, 3):
+            events = periodic(False, 0.004, lengths, queue_size)
+            self.assertEqual(periodic(True, 0.004, lengths, queue_size), events)
+            # the arrival times the scheduler computes
+            times = [0.0]
+            for _ in lengths[1:]:
+                times.append(times[-1] + 0.004)
+            self.check(events, times, lengths, queue_size)
+
+    def test_ties_with_setup_events(self):
+        times = [0.004 * i for i in range(200)]
+        lengths = [1000] * 200
+        for queue_size in (1, 2, 3):
+            events = scheduled(False, times, lengths, queue_size)
+            self.assertEqual(scheduled(True, times, lengths, queue_size), events)
+            self.check(events, times, lengths, queue_size)
+
+    def test_random_traffic(self):
+        generator = random.Random(3)
+        for queue_size in (2, 5):
+            times = []
+            time = 0.0
+            for _ in range(500):
+                # arrival times on a 1 ms grid, so many of them tie
+                time += generator.choice((0, 0.001, 0.002, 0.004, 0.008))
+                times.append(time)
+            lengths = [generator.choice((125, 250, 500, 1000)) for _ in times]
+            events = scheduled(False, times, lengths, queue_size)
+            self.assertEqual(scheduled(True, times, lengths, queue_size), events)
+            self.check(events, times, lengths, queue_size)
+
+
+class FakeLink(object):
+    bandwidth = 1000000.0
+    propagation = 0.001
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.packet import Packet, PacketPool, fields
+from src.sim import Simulation
+from src.tcppacket import TCPPacket
+
+
+class Tagged(Packet):
+    """ A user subclass without __slots__, so it also has a __dict__. """
+
+    def __init__(self, tag=None, **options):
+        Packet.__init__(self, **options)
+        self.tag = tag
+
+
+class Slotted(TCPPacket):
+    __slots__ = ('hops',)
+
+
+def values(packet):
+    return dict((name, getattr(packet, name)) for name in fields(packet.__class__) if hasattr(packet, name))
+
+
+class CloneTest(unittest.TestCase):
+    def test_fields(self):
+        packet = TCPPacket(source_address=3, destination_address=0, ident=7, body=b'data',
+                           sequence=1000, ack_number=42)
+        packet.created = 1.5
+        packet.queueing_delay = 0.25
+        copy = packet.clone()
+        self.assertIsNot(copy, packet)
+        self.assertIs(copy.__class__, TCPPacket)
+        self.assertEqual(values(copy), values(packet))
+        self.assertEqual(copy.sequence, 1000)
+        # the body is shared, the header isn't
+        self.assertIs(copy.body, packet.body)
+        copy.ttl -= 1
+        copy.propagation_delay = 0.5
+        self.assertEqual(packet.ttl, 100)
+        self.assertEqual(packet.propagation_delay, 0)
+
+    def test_subclasses(self):
+        packet = Tagged(tag=['a'], ident=1, body=b'xy')
+        copy = packet.clone()
+        self.assertIs(copy.__class__, Tagged)
+        self.assertEqual((copy.ident, copy.length, copy.tag), (1, 2, ['a']))
+        copy.tag = 'b'
+        self.assertEqual(packet.tag, ['a'])
+        # a slot that was never set stays unset in the copy
+        slotted = Slotted(sequence=5)
+        copy = slotted.clone()
+        self.assertEqual(copy.sequence, 5)
+        self.assertFalse(hasattr(copy, 'hops'))
+        slotted.hops = 3
+        self.assertEqual(slotted.clone().hops, 3)
+
+
+class PoolTest(unittest.TestCase):
+    def test_reuse(self):
+        sim = Simulation(seed=1)
+        sim.packet_pool = PacketPool()
+        packet = sim.packet(TCPPacket, source_address=2, body=b'abc', sequence=9)
+        packet.created = 1.0
+        packet.queueing_delay = 0.5
+        packet.ttl = 3
+        sim.release(packet)
+        # released packets are only handed out for their own class
+        other = sim.packet(Packet, ident=1)
+        self.assertIsNot(other, packet)
+        again = sim.packet(TCPPacket, destination_address=4, ack_number=100)
+        self.assertIs(again, packet)
+        self.assertEqual(sim.packet_pool.reused, 1)
+        # every field is reset as by a new packet
+        self.assertEqual(values(again), values(TCPPacket(destination_address=4, ack_number=100)))
+        # with the pool full, released packets are left to the garbage
+        # collector
+        pool = PacketPool(size=2)
+        for packet in [Packet() for _ in range(3)]:
+            pool.release(packet)
+        self.assertEqual(len(pool.free[Packet]), 2)
+
+    def test_no_pool(self):
+        sim = Simulation(seed=1)
+        packet = sim.packet(Packet, ident=1)
+        sim.release(packet)
+        self.assertIsNot(sim.packet(Packet, ident=2), packet)
+
+
+if __name__ == '__main__':
+    unittest.main()
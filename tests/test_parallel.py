@@ -0,0 +1,128 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.packet import Packet
+from src.scheduler import NodeScheduler
+from src.sim import Simulation
+
+from networks.network import Network
+from networks.parallel import ParallelSimulation
+
+config = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'networks', 'fifteen-nodes.txt')
+
+
+class Recorder(object):
+    def __init__(self, sim, hostname):
+        self.sim = sim
+        self.hostname = hostname
+        self.packets = []
+
+    def receive_packet(self, packet):
+        self.packets.append((self.hostname, self.sim.scheduler.current_time(), packet.ident,
+                             packet.queueing_delay))
+
+
+class Constant(object):
+    """ Sends a packet every period seconds, so the generators of all
+        nodes fire at the same times. """
+
+    def __init__(self, node, destinations, offset, period=0.004, duration=0.5):
+        self.node = node
+        self.sim = node.sim
+        self.destinations = destinations
+        self.offset = offset
+        self.period = period
+        self.duration = duration
+        self.sent = 0
+
+    def handle(self, event):
+        if self.sim.scheduler.current_time() > self.duration:
+            return
+        self.sent += 1
+        destination = self.destinations[(7 * self.sent + self.offset) % len(self.destinations)]
+        packet = Packet(destination_address=destination, ident=(self.node.hostname, self.sent),
+                        protocol='record', length=1000)
+        self.sim.scheduler.add(delay=0, event=packet, handler=self.node.send_packet)
+        self.sim.scheduler.add(delay=self.period, event='generate', handler=self.handle)
+
+
+class Flapper(object):
+    """ Belongs to a node and, when started, brings that node's links
+        back up after delay seconds. """
+
+    def __init__(self, node, delay):
+        self.node = node
+        self.sim = node.sim
+        self.delay = delay
+
+    def handle(self, event):
+        for link in self.node.links:
+            self.sim.scheduler.add(delay=self.delay, event=None, handler=link.up)
+
+
+def setup(sim, net, local, delay=None):
+    net.routing()
+    net.loss(0.05)
+    for node in net.nodes.values():
+        for link in node.links:
+            link.queue_size = 3
+    destinations = [net.nodes[name].links[0].address for name in sorted(net.nodes)]
+    recorders = []
+    for offset, name in enumerate(sorted(net.nodes)):
+        node = net.nodes[name]
+        recorder = Recorder(sim, name)
+        node.add_protocol(protocol='record', handler=recorder)
+        recorders.append(recorder)
+        generator = Constant(node, destinations, offset)
+        sim.scheduler.add(delay=0, event='generate', handler=generator.handle)
+    if delay is not None:
+        # n1's links go down, and at 0.2 seconds n1 itself schedules
+        # them to come back up
+        n1 = net.nodes['n1']
+        for link in n1.links:
+            sim.scheduler.add(delay=0.1, event=None, handler=link.down)
+        sim.scheduler.add(delay=0.2, event=None, handler=Flapper(n1, delay).handle)
+    return [recorder.packets for recorder in recorders]
+
+
+class ParallelTest(unittest.TestCase):
+    def sequential(self, *args):
+        sim = Simulation(seed=1)
+        sim.scheduler = NodeScheduler()
+        net = Network(config, sim=sim)
+        packets = setup(sim, net, set(net.nodes), *args)
+        sim.scheduler.run()
+        return sorted(packet for recorder in packets for packet in recorder)
+
+    def test_matches_sequential_with_ties(self):
+        expected = self.sequential()
+        self.assertTrue(expected)
+        for partitions in (2, 3, 5):
+            simulation = ParallelSimulation(config, setup, partitions=partitions, seed=1, processes=False)
+            results = simulation.run()
+            packets = sorted(packet for result in results for recorder in result for packet in recorder)
+            self.assertEqual(packets, expected, "%d partitions" % partitions)
+
+    def test_link_changes(self):
+        # every partition's router has to see n1's links go down and
+        # come back up, including those in other partitions
+        expected = self.sequential(0.01)
+        self.assertNotEqual(expected, self.sequential())
+        for partitions in (2, 3, 5):
+            simulation = ParallelSimulation(config, setup, partitions=partitions, seed=1,
+                                            args=(0.01,), processes=False)
+            results = simulation.run()
+            packets = sorted(packet for result in results for recorder in result for packet in recorder)
+            self.assertEqual(packets, expected, "%d partitions" % partitions)
+
+    def test_link_change_inside_window(self):
+        simulation = ParallelSimulation(config, setup, partitions=2, seed=1, args=(0,),
+                                        processes=False)
+        self.assertRaises(RuntimeError, simulation.run)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src import queues, tracelog
+from src.packet import Packet
+
+
+class Link(object):
+    """ Stands in for the link a queue is attached to and records the
+        packets it drops. """
+
+    def __init__(self):
+        self.dropped = []
+
+    def drop(self, packet, reason):
+        self.dropped.append((packet, reason))
+
+
+def packets(count, **fields):
+    return [Packet(ident=i, length=1000, **fields) for i in range(count)]
+
+
+class DropTailTest(unittest.TestCase):
+    def test_fifo(self):
+        queue = queues.DropTail(limit=3)
+        sent = packets(4)
+        for packet in sent:
+            if queue.admit(packet, 0) is None:
+                queue.enqueue(packet, 0)
+        self.assertEqual(queue.admit(sent[3], 0), tracelog.OVERFLOW)
+        self.assertEqual([queue.dequeue(0) for _ in range(4)], sent[:3] + [None])
+
+
+class REDTest(unittest.TestCase):
+    def test_thresholds(self):
+        queue = queues.RED(min_threshold=5, max_threshold=15, max_probability=0.05,
+                           weight=0.01, random=random.Random(1))
+        for packet in packets(4):
+            queue.enqueue(packet, 0)
+        # a short queue is never dropped from
+        self.assertTrue(all(queue.admit(packet, 0) is None for packet in packets(2000)))
+        for packet in packets(6):
+            queue.enqueue(packet, 0)
+        # with the average at ten packets the base probability is 0.025
+        # and counting spreads drops out evenly: one in 20 on average,
+        # never more than 40 apart once the average has settled
+        drops = [i for i, packet in enumerate(packets(5000)) if queue.admit(packet, 0) is not None]
+        self.assertTrue(0.04 < len(drops) / 5000.0 < 0.06)
+        steady = [drop for drop in drops if drop > 1000]
+        self.assertTrue(max(b - a for a, b in zip(steady, steady[1:])) <= 40)
+        for packet in packets(10):
+            queue.enqueue(packet, 0)
+        # above max_threshold every arrival is dropped
+        reasons = [queue.admit(packet, 0) for packet in packets(2000)]
+        self.assertEqual(reasons[-100:], [tracelog.EARLY] * 100)
+
+    def test_idle(self):
+        # the average decays while the queue is empty
+        queue = queues.RED(weight=0.1, packet_time=0.001, random=random.Random(1))
+        for packet in packets(20):
+            queue.enqueue(packet, 0)
+        for packet in packets(50):
+            queue.admit(packet, 0)
+        self.assertTrue(queue.average > 15)
+        while queue.dequeue(1.0) is not None:
+            pass
+        queue.admit(Packet(), 1.1)
+        self.assertTrue(queue.average < 0.01)
+
+
+class CoDelTest(unittest.TestCase):
+    def run_queue(self, count, interval):
+        """ Queue count packets at time 0 and send one every interval;
+            return the times packets were dropped at. """
+        link = Link()
+        queue = queues.CoDel(target=0.005, interval=0.1)
+        queue.attach(link)
+        for packet in packets(count):
+            queue.enqueue(packet, 0)
+        drops = []
+        sent = 0
+        for step in range(1, 2 * count):
+            before = len(link.dropped)
+            if queue.dequeue(step * interval) is None:
+                break
+            sent += 1
+            drops.extend([step * interval] * (len(link.dropped) - before))
+        self.assertEqual(sent + len(link.dropped), count)
+        self.assertTrue(all(reason == tracelog.EARLY for _, reason in link.dropped))
+        return drops
+
+    def test_no_drops_below_target(self):
+        self.assertEqual(self.run_queue(200, 0.000001), [])
+
+    def test_control_law(self):
+        drops = self.run_queue(2000, 0.001)
+        # packets wait longer than target from the dequeue at 0.005 on,
+        # so the first drop comes an interval later; after n drops the
+        # next is due interval / sqrt(n) after the last one was, and
+        # happens at the first dequeue after that
+        self.assertTrue(0.105 <= drops[0] < 0.106 + 1e-9)
+        due = drops[0]
+        for n, time in enumerate(drops[1:-1], 1):
+            due += 0.1 / n ** 0.5
+            self.assertTrue(due <= time < due + 0.001 + 1e-9, (n, time, due))
+        self.assertTrue(len(drops) > 50)
+
+
+class PriorityTest(unittest.TestCase):
+    def test_bands(self):
+        queue = queues.Priority(limit=2, bands=3)
+        sent = []
+        for priority in (2, 1, 0, 5, 1, 0):
+            packet = Packet(ident=len(sent), priority=priority)
+            sent.append(packet)
+            self.assertEqual(queue.admit(packet, 0), None)
+            queue.enqueue(packet, 0)
+        # the last band takes priorities beyond it and is full now
+        self.assertEqual(queue.admit(Packet(priority=2), 0), tracelog.OVERFLOW)
+        self.assertEqual(queue.admit(Packet(priority=0), 0), tracelog.OVERFLOW)
+        self.assertEqual(len(queue), 6)
+        order = [queue.dequeue(0).ident for _ in range(6)]
+        # highest band first, in arrival order within a band
+        self.assertEqual(order, [2, 5, 1, 4, 0, 3])
+        self.assertEqual(queue.dequeue(0), None)
+        self.assertEqual(len(queue), 0)
+
+    def test_classify(self):
+        queue = queues.Priority(bands=2, classify=lambda packet: packet.length > 100)
+        big = Packet(body=b'x' * 500)
+        small = Packet(body=b'x' * 50)
+        for packet in (big, small):
+            queue.enqueue(packet, 0)
+        self.assertEqual([queue.dequeue(0), queue.dequeue(0)], [small, big])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.sim import Simulation
+
+from networks import generators
+from networks.network import Network
+from networks.routing import Router
+
+
+def network(hierarchical=False):
+    """ A preferential-attachment graph whose links have random delays
+        and bandwidths. """
+    net = Network(generators.barabasi_albert(80, 2, seed=3, bandwidth=1e6, propagation=0.001),
+                  sim=Simulation(seed=1), hierarchical=hierarchical)
+    generator = random.Random(2)
+    for name in sorted(net.nodes):
+        for link in net.nodes[name].links:
+            link.propagation = generator.choice([0.001, 0.002, 0.005])
+            link.bandwidth = generator.choice([1e6, 1e7, 1e8])
+    return net
+
+
+def tables(net):
+    return dict((name, sorted((route, link.address) for route, link in node.forwarding_table.items()))
+                for name, node in net.nodes.items())
+
+
+def routed(router):
+    """ Return the length of the route every node's forwarding table
+        gives it to every node, following the tables hop by hop. """
+    net = router.net
+    result = {}
+    for destination in net.nodes.values():
+        address = min(destination.addresses)
+        lengths = result[destination.hostname] = {}
+        for start in net.nodes.values():
+            node = start
+            total = 0
+            for _ in range(len(net.nodes)):
+                if node is destination:
+                    lengths[start.hostname] = round(total, 9)
+                    break
+                link = node.forwarding_table.lookup(address)
+                if link is None:
+                    break
+                total += 1 if router.cost is None else router.cost(link)
+                node = net.nodes[link.endpoint.hostname]
+    return result
+
+
+def shortest(router):
+    """ Return the shortest distance from every node to every node. """
+    return dict((destination.hostname,
+                 dict((node.hostname, round(length, 9))
+                      for node, length in router.search(destination)[0].items()))
+                for destination in router.net.nodes.values())
+
+
+class RouterTest(unittest.TestCase):
+    def test_compute(self):
+        # installing every table at once gives the same routes as
+        # computing them one destination at a time
+        for hierarchical in (False, True):
+            for metric in ('hops', 'delay', 'bandwidth'):
+                eager = network(hierarchical)
+                eager.routing(metric).compute()
+                lazy = network(hierarchical)
+                router = lazy.routing(metric)
+                for name in sorted(lazy.nodes):
+                    router.update(lazy.nodes[name])
+                self.assertEqual(tables(eager), tables(lazy))
+
+    def test_link_changes(self):
+        for metric in ('hops', 'delay', 'bandwidth'):
+            net = network()
+            router = net.routing(metric, eager=True)
+            links = [link for name in sorted(net.nodes) for link in net.nodes[name].links]
+            generator = random.Random(4)
+            for _ in range(30):
+                link = generator.choice(links)
+                if link.running:
+                    link.down(None)
+                else:
+                    link.up(None)
+                fresh = network()
+                for name in sorted(net.nodes):
+                    for old, new in zip(net.nodes[name].links, fresh.nodes[name].links):
+                        new.running = old.running
+                self.assertEqual(routed(router), shortest(Router(fresh, metric)))
+
+    def test_routing_again(self):
+        net = network()
+        first = net.routing('hops', eager=True)
+        second = net.routing('delay')
+        for node in net.nodes.values():
+            self.assertIs(node.router, second)
+            self.assertEqual(len(node.forwarding_table), 0)
+            for link in node.links:
+                self.assertEqual(link.watchers, [second.link_changed])
+        second.compute()
+        self.assertEqual(routed(second), shortest(second))
+        self.assertEqual(first.routed, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.eventqueue import CalendarQueue, HeapQueue
+from src.profiler import Profiler
+from src.scheduler import NodeScheduler, Scheduler
+
+
+class Ticker(object):
+    """ Stands in for a node: at time 0 it schedules a tick one second
+        later. """
+
+    def __init__(self, scheduler, hostname, log):
+        self.scheduler = scheduler
+        self.hostname = hostname
+        self.log = log
+
+    def start(self, event):
+        self.scheduler.add(delay=1, event='tick', handler=self.tick)
+
+    def tick(self, event):
+        self.log.append((self.scheduler.current_time(), self.hostname, event))
+
+
+def ticks(scheduler):
+    log = []
+    for hostname in ('b', 'a'):
+        ticker = Ticker(scheduler, hostname, log)
+        scheduler.add(delay=0, event=None, handler=ticker.start)
+    scheduler.run()
+    return log
+
+
+class TieTest(unittest.TestCase):
+    def test_insertion_order(self):
+        # b's tick was scheduled first, so it runs first
+        self.assertEqual(ticks(Scheduler()), [(1, 'b', 'tick'), (1, 'a', 'tick')])
+        self.assertEqual(ticks(Scheduler('calendar')), [(1, 'b', 'tick'), (1, 'a', 'tick')])
+
+    def test_node_order(self):
+        # each tick was scheduled by its own node, so they run in
+        # hostname order
+        self.assertEqual(ticks(NodeScheduler()), [(1, 'a', 'tick'), (1, 'b', 'tick')])
+
+
+
+class Recorder(object):
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.log = []
+
+    def record(self, event):
+        self.log.append((self.scheduler.current_time(), event))
+
+
+class CancelTest(unittest.TestCase):
+    def test_cancel(self):
+        for backend in ('heap', 'calendar'):
+            scheduler = Scheduler(backend)
+            recorder = Recorder(scheduler)
+            entries = [scheduler.add(delay=i % 7, event=i, handler=recorder.record) for i in range(100)]
+            for entry in entries[::3]:
+                scheduler.cancel(entry)
+            # cancelling twice counts once
+            scheduler.cancel(entries[0])
+            self.assertEqual(scheduler.cancelled, 34)
+            self.assertEqual(scheduler.run(), 66)
+            expected = sorted((i % 7, i) for i in range(100) if i % 3)
+            self.assertEqual(recorder.log, expected)
+            self.assertEqual(scheduler.cancelled, 0)
+            # cancelling an event that already ran does nothing
+            scheduler.cancel(entries[1])
+            self.assertEqual(scheduler.cancelled, 0)
+
+    def test_purge(self):
+        # a timer that is cancelled and re-armed on every event doesn't
+        # grow the queue with tombstones
+        for backend in ('heap', 'calendar'):
+            scheduler = Scheduler(backend)
+            recorder = Recorder(scheduler)
+            timer = scheduler.add(delay=10, event='timeout', handler=recorder.record)
+            for i in range(1000):
+                scheduler.add(delay=i * 0.001, event=i, handler=recorder.record)
+            for i in range(1000):
+                scheduler.step()
+                scheduler.cancel(timer)
+                timer = scheduler.add(delay=10, event='timeout', handler=recorder.record)
+                # at most as many tombstones as live events, or 64
+                live = 1000 - i
+                self.assertTrue(len(scheduler.queue) <= live + max(live, 64) + 1)
+            self.assertEqual(scheduler.run(), 1)
+            self.assertEqual(recorder.log[-1], (0.999 + 10, 'timeout'))
+            self.assertEqual(scheduler.cancelled, 0)
+
+    def test_calendar_order(self):
+        # the calendar queue pops entries in the same order as the heap
+        # while it resizes, with many equal times and with cancelled
+        # entries purged on the way
+        generator = random.Random(1)
+        heap = HeapQueue()
+        calendar = CalendarQueue()
+        count = 0
+        for step in range(20000):
+            if generator.random() < 0.55 or not len(heap):
+                time = generator.choice([generator.random() * 100, float(generator.randrange(3))])
+                entry = [time, count, None, 'handler']
+                count += 1
+                heap.push(entry)
+                calendar.push(list(entry))
+            else:
+                self.assertEqual(calendar.pop(), heap.pop())
+            if step % 5000 == 4999:
+                for queue in (heap, calendar):
+                    for entry in (queue.heap if queue is heap else queue.entries()):
+                        if entry[1] % 4 == 0:
+                            entry[3] = None
+                    queue.purge()
+                self.assertEqual(len(calendar), len(heap))
+        while len(heap):
+            self.assertEqual(calendar.pop(), heap.pop())
+        self.assertEqual(len(calendar), 0)
+
+
+class Chain(object):
+    """ Events that each schedule the next after a random delay, and
+        log the times they run at. """
+
+    def __init__(self, scheduler, generator):
+        self.scheduler = scheduler
+        self.random = generator
+        self.log = []
+
+    def fire(self, event):
+        self.log.append(self.scheduler.current_time())
+        if event > 0:
+            self.scheduler.add(delay=self.random.uniform(0, 1000), event=event - 1, handler=self.fire)
+
+
+def chain(scheduler, seed, **options):
+    """ Run a chain of events, in calls of run that stop at random
+        times if options are given, and return the times logged. """
+    events = Chain(scheduler, random.Random(seed))
+    scheduler.add(delay=0, event=5, handler=events.fire)
+    if not options:
+        scheduler.run()
+        return events.log
+    stops = random.Random(-seed - 1)
+    until = 0
+    while scheduler.queue:
+        until += stops.uniform(0, 500)
+        scheduler.run(until=until, **options)
+        if scheduler.queue:
+            assert scheduler.current_time() <= until
+    return events.log
+
+
+class ResumeTest(unittest.TestCase):
+    def test_chunks(self):
+        # a run split into calls that stop at arbitrary times gives the
+        # same event times as one run, down to the last bit
+        for cls in (Scheduler, NodeScheduler):
+            for seed in range(300):
+                whole = chain(cls(), seed)
+                self.assertEqual(chain(cls(), seed, max_events=None), whole)
+                self.assertEqual(chain(cls(), seed, profile=Profiler()), whole)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.link import Link
+from src.sim import Simulation
+
+
+class StreamTest(unittest.TestCase):
+    def losses(self, sim=None):
+        link = Link(loss=0.3, sim=sim)
+        return [link.loss_model.lost() for _ in range(200)]
+
+    def test_random_seed_controls_default_simulation(self):
+        runs = []
+        for seed in (1, 2, 3, 1):
+            random.seed(seed)
+            runs.append(self.losses())
+        self.assertNotEqual(runs[0], runs[1])
+        self.assertNotEqual(runs[1], runs[2])
+        self.assertEqual(runs[0], runs[3])
+
+    def test_seeded_streams_repeat(self):
+        self.assertEqual(self.losses(Simulation(seed=5)), self.losses(Simulation(seed=5)))
+        self.assertNotEqual(self.losses(Simulation(seed=5)), self.losses(Simulation(seed=6)))
+
+
+if __name__ == '__main__':
+    unittest.main()
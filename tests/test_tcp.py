@@ -0,0 +1,127 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src import tracelog
+from src.packet import PacketPool
+from src.sim import Simulation
+from src.tcp import TCP
+from src.tcppacket import TCPPacket
+from src.transport import Transport
+
+from networks.network import Network
+
+config = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'networks', 'one-hop.txt')
+
+
+class Receiver(object):
+    def __init__(self, sim):
+        self.sim = sim
+        self.data = []
+        self.finished = 0
+
+    def receive_data(self, data):
+        self.data.append(bytes(data))
+        self.finished = self.sim.scheduler.current_time()
+
+
+def transfer(data, loss=0, log=None, **options):
+    """ Send data from n1 to n2 and return what n2's application got
+        and the sending TCP. The receiving TCP is the application's tcp
+        attribute. If log is given, the run is logged to that path. """
+    sim = Simulation(seed=1)
+    if log is not None:
+        sim.set_log(log)
+    net = Network(config, sim=sim)
+    net.loss(loss)
+    n1 = net.get_node('n1')
+    n2 = net.get_node('n2')
+    n1.add_forwarding_entry(address=n2.get_address('n1'), link=n1.links[0])
+    n2.add_forwarding_entry(address=n1.get_address('n2'), link=n2.links[0])
+    receiver = Receiver(sim)
+    c1 = TCP(Transport(n1), n1.get_address('n2'), 1, n2.get_address('n1'), 1, **options)
+    receiver.tcp = TCP(Transport(n2), n2.get_address('n1'), 1, n1.get_address('n2'), 1, receiver,
+                       **options)
+    sim.scheduler.add(delay=0, event=data, handler=c1.send)
+    sim.scheduler.run()
+    sim.close_log()
+    return receiver, c1
+
+
+class TCPTest(unittest.TestCase):
+    data = bytes(bytearray(i % 251 for i in range(5000)))
+
+    def test_windows(self):
+        for window in (500, 1000, 1500, 64000):
+            receiver, sender = transfer(self.data, window=window)
+            self.assertEqual(b''.join(receiver.data), self.data, "window %d" % window)
+            self.assertEqual(sender.send_buffer.outstanding(), 0)
+
+    def test_loss(self):
+        data = self.data * 20
+        for congestion in ('reno', 'newreno', 'cubic'):
+            for window in (500, 20000):
+                receiver, sender = transfer(data, loss=0.1, window=window, congestion=congestion)
+                self.assertEqual(b''.join(receiver.data), data, "%s, window %d" % (congestion, window))
+
+    def test_delayed_ack(self):
+        # the first segments are acknowledged at once, so slow start
+        # isn't held back, and later ones in pairs
+        data = self.data * 10
+        for congestion in ('reno', 'cubic'):
+            immediate, _ = transfer(data, window=64000, congestion=congestion)
+            delayed, _ = transfer(data, window=64000, congestion=congestion, delayed_ack=True)
+            self.assertEqual(b''.join(delayed.data), data)
+            self.assertEqual(delayed.finished, immediate.finished)
+            self.assertTrue(delayed.tcp.acks_sent < 0.7 * immediate.tcp.acks_sent)
+        # after a loss the receiver acknowledges at once again
+        delayed, sender = transfer(data * 4, loss=0.05, window=64000, delayed_ack=True)
+        self.assertEqual(b''.join(delayed.data), data * 4)
+        self.assertTrue(sender.retransmissions > 0)
+        self.assertTrue(delayed.tcp.quickacks > 0)
+
+    def test_retransmissions_logged(self):
+        # fast retransmits are logged like timeouts; Reno resends
+        # nothing else on its own
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'tcp.log')
+            receiver, sender = transfer(self.data * 20, loss=0.05, log=path, window=20000,
+                                        congestion='reno')
+            with open(path, 'rb') as f:
+                log = f.read()
+        finally:
+            shutil.rmtree(directory)
+        size = tracelog.record_format.size
+        kinds = [tracelog.record_format.unpack_from(log, offset)[1] for offset in range(0, len(log), size)]
+        self.assertTrue(sender.fast_retransmits > 0)
+        self.assertEqual(kinds.count(tracelog.TCP_RETRANSMIT), sender.fast_retransmits + sender.timeouts)
+
+    def test_release(self):
+        # only unicast segments go back to the pool once handled
+        sim = Simulation(seed=1)
+        sim.packet_pool = PacketPool()
+        net = Network(config, sim=sim)
+        n1 = net.get_node('n1')
+        n2 = net.get_node('n2')
+        receiver = Receiver(sim)
+        tcp = TCP(Transport(n2), n2.get_address('n1'), 1, n1.get_address('n2'), 1, receiver)
+        unicast = TCPPacket(source_address=n1.get_address('n2'), source_port=1,
+                            destination_address=n2.get_address('n1'), destination_port=1, body=b'ab')
+        broadcast = TCPPacket(source_address=n1.get_address('n2'), source_port=1,
+                              destination_address=0, destination_port=1, body=b'cd', sequence=2)
+        pool = sim.packet_pool
+        tcp.receive_packet(unicast)
+        self.assertEqual(pool.free[TCPPacket], [unicast])
+        # the ACK for the broadcast segment reuses the first one
+        tcp.receive_packet(broadcast)
+        self.assertEqual(pool.free[TCPPacket], [])
+        self.assertEqual(b''.join(receiver.data), b'abcd')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.sim import Simulation
+
+from networks import generators, topology
+from networks.network import Network
+from networks.topology import Topology
+
+
+class TopologyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_and_load(self):
+        graph = generators.barabasi_albert(30, 2, seed=1, bandwidth=1e7, propagation=0.0015,
+                                           queue_size=20, loss=0.001)
+        path = os.path.join(self.directory, 'graph.txt')
+        graph.write(path)
+        topology.cache.clear()
+        parsed = topology.load(path)
+        self.assertEqual(parsed.links, graph.links)
+        self.assertEqual(parsed.settings, graph.settings)
+        # the compiled copy is complete and no temporary file is left
+        compiled = topology.compiled_path(os.path.abspath(path))
+        self.assertEqual(os.listdir(os.path.dirname(compiled)), [os.path.basename(compiled)])
+        topology.cache.clear()
+        loaded = topology.load(path)
+        self.assertEqual((loaded.nodes, loaded.links, loaded.settings),
+                         (parsed.nodes, parsed.links, parsed.settings))
+
+    def test_save_replaces(self):
+        path = os.path.join(self.directory, 'graph.topology')
+        small = generators.barabasi_albert(10, 1, seed=1, bandwidth=1e6)
+        large = generators.barabasi_albert(50, 2, seed=1, bandwidth=1e6)
+        large.save(path, (1.0, 2))
+        small.save(path, (3.0, 4))
+        result, stamp = Topology.read(path)
+        self.assertEqual(stamp, (3.0, 4))
+        self.assertEqual(result.links, small.links)
+        self.assertEqual(os.listdir(self.directory), ['graph.topology'])
+
+    def test_non_finite(self):
+        for value in (float('inf'), float('nan')):
+            graph = Topology()
+            graph.add_link('a', 'b', bandwidth=value)
+            self.assertRaises(ValueError, graph.write, os.path.join(self.directory, 'graph.txt'))
+
+    def test_network_setters(self):
+        net = Network(generators.barabasi_albert(3, 1, seed=1), sim=Simulation(seed=1))
+        link = net.nodes['n0'].links[0]
+        net.set_bandwidth(link, '10Mbps')
+        net.set_delay(link, '5ms')
+        net.set_queue(link, '40pkts')
+        net.set_loss(link, '0.01loss')
+        self.assertEqual((link.bandwidth, link.propagation, link.queue_size, link.loss),
+                         (1e7, 0.005, 40, 0.01))
+        # a field with another unit leaves the attribute alone
+        net.set_bandwidth(link, '3ms')
+        self.assertEqual(link.bandwidth, 1e7)
+        self.assertEqual(Network.convert('2.5Gbps'), 2.5)
+
+
+if __name__ == '__main__':
+    unittest.main()